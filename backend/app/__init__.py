@@ -122,9 +122,9 @@ def create_app() -> FastAPI:
 
         # Check OpenAI API availability (non-blocking)
         try:
-            from app.services.ai_classifier import AIClassifier
+            from app.services.ai_classifier import get_classifier
 
-            ai_classifier = AIClassifier()
+            ai_classifier = get_classifier()
             # Quick test - just check if client is initialized
             if not ai_classifier.client:
                 raise ValueError("OpenAI client not initialized")
@@ -151,6 +151,27 @@ def create_app() -> FastAPI:
             logger.warning(f"⚠️ Redis cache check failed: {e}, will use in-memory fallback")
             # Don't fail startup - fallback to in-memory cache
 
+        # Pre-populate classification cache with frequent messages (entries
+        # already cached are kept; a failure does not block startup)
+        try:
+            from app.services.classifier_warmup import warm_classification_cache
+
+            warmed = await warm_classification_cache()
+            logger.info(f"✅ Classification cache warmed ({warmed} entries)")
+        except Exception as e:
+            logger.warning(f"⚠️ Classification cache warmup failed: {e}")
+
+        # Start background webhook delivery workers
+        try:
+            from app.services.webhook_queue import get_webhook_queue
+
+            get_webhook_queue().start()
+            logger.info("✅ Webhook queue started")
+        except Exception as e:
+            logger.error(f"❌ Failed to start webhook queue: {e}")
+            if not settings.debug:
+                raise
+
         # Start reminder scheduler
         try:
             reminder_scheduler = ReminderScheduler()
@@ -208,8 +229,29 @@ def create_app() -> FastAPI:
         if hasattr(app.state, "reminder_scheduler"):
             app.state.reminder_scheduler.stop()
 
+        # Deliver queued webhooks before the HTTP client goes away
+        try:
+            from app.services.webhook_queue import get_webhook_queue
+            await get_webhook_queue().stop()
+        except Exception as e:
+            logger.debug(f"Webhook queue cleanup: {e}")
+
+        # Let detached deliveries (queue-less webhooks, operator notifications) finish
+        try:
+            from app.services.message_delivery_service import drain_background_deliveries
+            await drain_background_deliveries()
+        except Exception as e:
+            logger.debug(f"Background delivery cleanup: {e}")
+
         await close_db()
 
+        # Close pooled webhook HTTP client
+        try:
+            from app.services.webhook_sender import close_webhook_client
+            await close_webhook_client()
+        except Exception as e:
+            logger.debug(f"Webhook client cleanup: {e}")
+
         # Close Redis cache connection
         try:
             from app.utils.redis_cache import close_redis_cache
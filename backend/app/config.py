@@ -19,6 +19,7 @@ class Settings(BaseSettings):
 
     # Database
     database_url: str
+    db_statement_cache_size: int = 1024  # Prepared statements per connection (0 behind pgbouncer)
     # Supabase fields (optional, для будущего использования)
     supabase_url: str = ""
     supabase_anon_key: str = ""
@@ -31,6 +32,10 @@ class Settings(BaseSettings):
     # AI Settings
     ai_classification_timeout: int = 30
     ai_confidence_threshold: float = 0.85
+    ai_max_tokens: int = 120  # Enough for the JSON answer with short reasoning
+    ai_max_message_chars: int = 1000  # Longer messages are truncated in the prompt
+    ai_batch_window_ms: int = 0  # Concurrent API calls within this window share a request (0 = off)
+    ai_batch_max_size: int = 8  # Messages per batched request
 
     # Security
     secret_key: str
@@ -60,6 +65,9 @@ class Settings(BaseSettings):
     farewell_delay_seconds: float = 10.0  # Delay before sending farewell message
     delays_enabled: bool = True  # Enable/disable delays
 
+    # Response webhooks sent outside the delivery queue at once (per process)
+    webhook_max_concurrency: int = 64
+
     model_config = SettingsConfigDict(
         env_file=".env",
         case_sensitive=False,
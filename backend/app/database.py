@@ -9,6 +9,15 @@ from app.config import get_settings
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Keep prepared statements per pooled connection so the hot queries, which
+# differ only in bind params, are parsed and planned once by Postgres
+connect_args = {}
+if "+asyncpg" in settings.database_url:
+    connect_args = {
+        "statement_cache_size": settings.db_statement_cache_size,
+        "prepared_statement_cache_size": settings.db_statement_cache_size,
+    }
+
 # Create async engine
 engine = create_async_engine(
     settings.database_url,
@@ -17,6 +26,8 @@ engine = create_async_engine(
     pool_pre_ping=True,
     pool_size=20,
     max_overflow=40,
+    query_cache_size=1200,  # Compiled SQL cache, shared across sessions
+    connect_args=connect_args,
 )
 
 # Session factory
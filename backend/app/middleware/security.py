@@ -1,6 +1,7 @@
 import json
 import logging
-from typing import Any, Dict
+import re
+from typing import Any, Dict, List
 
 from fastapi import HTTPException, Request, status
 from starlette.middleware.base import BaseHTTPMiddleware
@@ -8,6 +9,22 @@ from starlette.middleware.base import BaseHTTPMiddleware
 logger = logging.getLogger(__name__)
 
 
+def _compile_any(patterns: List[str]) -> re.Pattern:
+    """Combine patterns into one alternation, so text is scanned once per check"""
+    # (?i) is only allowed at the start of a whole expression; it is applied
+    # to the combined pattern instead
+    return re.compile(
+        "|".join(f"(?:{pattern.replace('(?i)', '')})" for pattern in patterns),
+        re.IGNORECASE,
+    )
+
+
+# Paths that might legitimately contain SQL keywords
+_SAFE_PATH_PREFIXES = ("/api/search", "/api/messages", "/api/admin")
+# Common headers skipped to avoid false positives
+_SKIPPED_HEADERS = frozenset({"host", "accept", "content-type", "authorization"})
+
+
 class SecurityMiddleware(BaseHTTPMiddleware):
     """Add security headers and comprehensive input validation"""
 
@@ -51,6 +68,18 @@ class SecurityMiddleware(BaseHTTPMiddleware):
         r"<img[^>]*src\s*=\s*javascript:",
     ]
 
+    # Only obvious SQL injection attempts are checked in search queries
+    SEARCH_QUERY_PATTERNS = [
+        r"(?i)(union\s+(all\s+)?select)",
+        r"(?i)(;\s*(drop|delete|insert|update|exec))",
+        r"(?i)(--\s*$)",
+        r"(?i)(/\*.*\*/)",
+    ]
+
+    _PATH_RE = _compile_any(SQL_INJECTION_PATTERNS + PATH_TRAVERSAL_PATTERNS)
+    _INPUT_RE = _compile_any(SQL_INJECTION_PATTERNS + XSS_PATTERNS)
+    _SEARCH_QUERY_RE = _compile_any(SEARCH_QUERY_PATTERNS)
+
     async def dispatch(self, request: Request, call_next):
         # Check for suspicious patterns in all input sources
         if self._is_suspicious_request(request):
@@ -79,18 +108,11 @@ class SecurityMiddleware(BaseHTTPMiddleware):
 
     def _is_suspicious_request(self, request: Request) -> bool:
         """Check for suspicious patterns in path, query params, headers, and body"""
-        import re
-
-        # Whitelist of safe paths that might contain SQL keywords
-        safe_paths = ["/api/search", "/api/messages", "/api/admin"]
         path = request.url.path
 
         # Check URL path (but allow safe paths)
-        is_safe_path = any(path.startswith(safe) for safe in safe_paths)
-        if not is_safe_path:
-            if self._check_patterns(
-                path, self.SQL_INJECTION_PATTERNS + self.PATH_TRAVERSAL_PATTERNS
-            ):
+        if not path.startswith(_SAFE_PATH_PREFIXES):
+            if self._check_patterns(path, self._PATH_RE):
                 return True
 
         # Check query parameters (more lenient for search endpoints)
@@ -98,36 +120,19 @@ class SecurityMiddleware(BaseHTTPMiddleware):
         if query_string:
             # For search endpoints, be more lenient with query parameter
             if "/api/search" in path and "query=" in query_string:
-                # Only check for obvious SQL injection attempts in search queries
-                dangerous_patterns = [
-                    r"(?i)(union\s+(all\s+)?select)",
-                    r"(?i)(;\s*(drop|delete|insert|update|exec))",
-                    r"(?i)(--\s*$)",
-                    r"(?i)(/\*.*\*/)",
-                ]
-                if self._check_patterns(query_string, dangerous_patterns):
+                if self._check_patterns(query_string, self._SEARCH_QUERY_RE):
                     return True
             else:
                 # For other endpoints, check all patterns
-                if self._check_patterns(
-                    query_string, self.SQL_INJECTION_PATTERNS + self.XSS_PATTERNS
-                ):
+                if self._check_patterns(query_string, self._INPUT_RE):
                     return True
 
         # Check headers (but allow common headers that might contain SQL keywords)
-        suspicious_headers = ["x-forwarded-for", "x-real-ip", "user-agent"]
         for header_name, header_value in request.headers.items():
             # Skip common headers that might have false positives
-            if header_name.lower() in [
-                "host",
-                "accept",
-                "content-type",
-                "authorization",
-            ]:
+            if header_name.lower() in _SKIPPED_HEADERS:
                 continue
-            if self._check_patterns(
-                str(header_value), self.SQL_INJECTION_PATTERNS + self.XSS_PATTERNS
-            ):
+            if self._check_patterns(str(header_value), self._INPUT_RE):
                 return True
 
         # Check request body for POST/PUT/PATCH requests
@@ -142,25 +147,17 @@ class SecurityMiddleware(BaseHTTPMiddleware):
 
         return False
 
-    def _check_patterns(self, text: str, patterns: list) -> bool:
-        """Check if text matches any of the suspicious patterns"""
-        import re
-
+    def _check_patterns(self, text: str, pattern: re.Pattern) -> bool:
+        """Check if text matches the combined suspicious pattern"""
         if not text:
             return False
 
-        text_lower = text.lower()
-        for pattern in patterns:
-            try:
-                if re.search(pattern, text_lower):
-                    logger.debug(
-                        f"Pattern matched: {pattern[:50]} in text: {text[:100]}"
-                    )
-                    return True
-            except re.error:
-                # Invalid regex pattern, skip it
-                logger.warning(f"Invalid regex pattern: {pattern}")
-                continue
+        match = pattern.search(text.lower())
+        if match:
+            logger.debug(
+                f"Pattern matched: {match.group(0)[:50]} in text: {text[:100]}"
+            )
+            return True
 
         return False
 
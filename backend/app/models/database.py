@@ -1,10 +1,11 @@
+import hashlib
 import uuid
 from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import JSON, Boolean, Column, DateTime
+from sqlalchemy import JSON, Boolean, Column, DateTime, and_
 from sqlalchemy import Enum as SQLEnum
-from sqlalchemy import Float, ForeignKey, Integer, String, Text
+from sqlalchemy import Float, ForeignKey, Index, Integer, LargeBinary, String, Text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
@@ -51,12 +52,23 @@ class EscalationReason(str, Enum):
     SYSTEM_ERROR = "system_error"
 
 
+def content_fingerprint(content: str) -> bytes:
+    """16-byte digest of message text, compared instead of the text itself"""
+    return hashlib.blake2b(content.encode(), digest_size=16).digest()
+
+
+def _content_hash_default(context) -> bytes:
+    return content_fingerprint(context.get_current_parameters()["content"])
+
+
 class Message(Base):
     __tablename__ = "messages"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     client_id = Column(String(255), nullable=False, index=True)
     content = Column(Text, nullable=False)
+    # Filled from content on insert; used by duplicate detection
+    content_hash = Column(LargeBinary(16), default=_content_hash_default, nullable=True)
     message_type = Column(
         SQLEnum(MessageType), default=MessageType.USER, nullable=False
     )
@@ -211,3 +223,20 @@ class ChatSession(Base):
     updated_at = Column(
         DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
     )
+
+    # Partial indexes for the auto-close scanner: only OPEN sessions are ever
+    # scanned, so the indexes stay small as closed history grows
+    __table_args__ = (
+        Index(
+            "ix_chat_sessions_open_activity",
+            last_activity_at,
+            postgresql_where=(status == DialogStatus.OPEN),
+        ),
+        Index(
+            "ix_chat_sessions_farewell_pending",
+            last_activity_at,
+            postgresql_where=and_(
+                status == DialogStatus.OPEN, farewell_sent_at.is_(None)
+            ),
+        ),
+    )
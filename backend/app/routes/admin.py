@@ -21,6 +21,8 @@ from app.models.schemas import (
     ResponseTemplateUpdate,
 )
 from app.services.model_retraining import ModelRetrainingService
+from app.services.response_manager import template_cache_key
+from app.utils.cache import get_cache
 
 logger = logging.getLogger(__name__)
 
@@ -147,6 +149,10 @@ async def update_template(
 
     await session.commit()
 
+    if has_changes:
+        # Serve the new version from this worker right away
+        get_cache().delete(template_cache_key(scenario_name))
+
     return ResponseTemplateResponse(
         id=str(template.id),
         scenario_name=template.scenario_name,
@@ -7,7 +7,7 @@ from sqlalchemy import text
 
 from app.config import get_settings
 from app.database import engine
-from app.services.ai_classifier import AIClassifier
+from app.services.ai_classifier import get_classifier
 from app.services.reminder_scheduler import ReminderScheduler
 from app.services.webhook_sender import WebhookSender
 
@@ -53,24 +53,24 @@ async def health_check_db():
 async def health_check_openai():
     """OpenAI API health check"""
     try:
-        ai_classifier = AIClassifier()
+        ai_classifier = get_classifier()
 
         # Try a simple classification request with timeout
         test_result = await asyncio.wait_for(
             ai_classifier.classify("test", client_id="health_check"), timeout=5.0
         )
 
-        if test_result.get("success"):
+        if test_result.success:
             return {
                 "status": "healthy",
                 "openai_api": "ok",
-                "model": test_result.get("model", "unknown"),
+                "model": test_result.model,
             }
         else:
             return {
                 "status": "degraded",
                 "openai_api": "error",
-                "error": test_result.get("error", "Unknown error"),
+                "error": test_result.error or "Unknown error",
             }
     except asyncio.TimeoutError:
         logger.warning("OpenAI API health check timed out")
@@ -149,14 +149,14 @@ async def health_check_full():
 
     # OpenAI API check
     try:
-        ai_classifier = AIClassifier()
+        ai_classifier = get_classifier()
         test_result = await asyncio.wait_for(
             ai_classifier.classify("test", client_id="health_check"), timeout=5.0
         )
-        if test_result.get("success"):
+        if test_result.success:
             checks["openai"] = {"status": "healthy"}
         else:
-            checks["openai"] = {"status": "degraded", "error": test_result.get("error")}
+            checks["openai"] = {"status": "degraded", "error": test_result.error}
             if overall_status == "healthy":
                 overall_status = "degraded"
     except Exception as e:
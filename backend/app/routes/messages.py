@@ -3,11 +3,11 @@ Refactored Messages Router
 Uses separate services for processing, response creation, and delivery
 """
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Optional
 
 from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Request, status
-from sqlalchemy import func, select
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
@@ -90,30 +90,35 @@ async def create_message(
             chat_id=x_chat_id,
         )
 
-        # ============ STEP 1: Rate limiting per client_id ============
-        if settings.rate_limit_enabled:
-            one_minute_ago = datetime.utcnow() - timedelta(minutes=1)
-            recent_messages_count = await session.execute(
-                select(func.count(Message.id)).where(
-                    Message.client_id == message_data.client_id,
-                    Message.created_at >= one_minute_ago,
-                )
-            )
-            count = recent_messages_count.scalar_one()
+        # ============ STEP 1-2: Rate limit and duplicate checks ============
+        # One round trip also tells whether this is the client's first message
+        preflight = await processing_service.preflight(
+            message_data.client_id,
+            message_data.content,
+            rate_limit=(
+                settings.rate_limit_message_per_minute
+                if settings.rate_limit_enabled
+                else None
+            ),
+        )
 
-            if count >= settings.rate_limit_message_per_minute:
-                logger.warning(
-                    f"[{request_id}] ⚠️ Rate limit exceeded for client {message_data.client_id}: "
-                    f"{count} messages in last minute"
-                )
-                raise HTTPException(
-                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                    detail=f"Rate limit exceeded: maximum {settings.rate_limit_message_per_minute} messages per minute per client",
-                )
+        if (
+            settings.rate_limit_enabled
+            and preflight.recent_count >= settings.rate_limit_message_per_minute
+        ):
+            logger.warning(
+                f"[{request_id}] ⚠️ Rate limit exceeded for client {message_data.client_id}: "
+                f"{preflight.recent_count} messages in last minute"
+            )
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Rate limit exceeded: maximum {settings.rate_limit_message_per_minute} messages per minute per client",
+            )
 
-        # ============ STEP 2: Check for duplicate ============
-        duplicate_message = await processing_service.check_duplicate(
-            message_data.client_id, message_data.content
+        duplicate_message = (
+            await session.get(Message, preflight.duplicate_id)
+            if preflight.duplicate_id
+            else None
         )
 
         if duplicate_message:
@@ -175,6 +180,7 @@ async def create_message(
                 webhook_url=x_webhook_url,
                 platform=x_platform,
                 chat_id=x_chat_id,
+                is_first_message=preflight.is_first_message,
             )
             
             # Check if mass outage was detected
@@ -214,7 +220,6 @@ async def create_message(
         # Webhook and WebSocket delivery happens in background tasks
         # This allows API to return immediately without blocking
         delivery_result = delivery_service.schedule_delivery(
-            background_tasks,
             processed_message,
             message_response,
         )
@@ -224,16 +229,16 @@ async def create_message(
         if mass_outage_detected:
             async def send_mass_notification():
                 try:
-                    from app.services.mass_notification_service import MassNotificationService
-                    from app.database import async_session_maker
-                    
-                    async with async_session_maker() as notification_session:
-                        notification_service = MassNotificationService(notification_session)
-                        result = await notification_service.send_mass_outage_notification()
-                        logger.info(
-                            f"📢 Mass outage notification sent: {result.get('sent')} clients notified, "
-                            f"{result.get('failed')} failed"
-                        )
+                    from app.services.mass_notification_service import (
+                        get_mass_notification_dispatcher,
+                    )
+
+                    # Triggers from the same outage burst share one send
+                    result = await get_mass_notification_dispatcher().notify()
+                    logger.info(
+                        f"📢 Mass outage notification sent: {result.get('sent')} clients notified, "
+                        f"{result.get('failed')} failed"
+                    )
                 except Exception as e:
                     logger.error(
                         f"❌ Error sending mass outage notifications: {type(e).__name__}: {str(e)}",
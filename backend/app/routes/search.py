@@ -6,7 +6,7 @@ from io import StringIO
 from typing import Dict
 
 from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
-from fastapi.responses import StreamingResponse
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_session
@@ -75,10 +75,9 @@ async def export_dialog_csv(
 ):
     """Export dialog as CSV"""
     service = ExportService(session)
-    csv_data = await service.export_dialog_csv(client_id)
 
     return StreamingResponse(
-        iter([csv_data]),
+        service.export_dialog_csv(client_id),
         media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename=dialog_{client_id}.csv"},
     )
@@ -90,8 +89,11 @@ async def export_dialog_json(
 ):
     """Export dialog as JSON"""
     service = ExportService(session)
-    json_data = await service.export_dialog_json(client_id)
-    return json_data
+
+    return StreamingResponse(
+        service.stream_dialog_json(client_id),
+        media_type="application/json",
+    )
 
 
 @router.get("/export/report")
@@ -101,7 +103,9 @@ async def export_report(
     """Export analytics report"""
     service = ExportService(session)
     report = await service.export_analytics_report(hours=hours)
-    return report
+    # Plain dict of str/number values: encode with orjson directly,
+    # skipping jsonable_encoder and the stdlib json encoder
+    return ORJSONResponse(report)
 
 
 @router.post("/export/results")
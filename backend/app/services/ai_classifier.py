@@ -1,8 +1,15 @@
+import asyncio
 import hashlib
-import json
 import logging
-from typing import Dict, Optional
+import math
+import re
+import unicodedata
+from dataclasses import asdict, dataclass, replace
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple, Union
 
+import httpx
+import orjson
 from openai import AsyncOpenAI
 from tenacity import retry, stop_after_attempt, wait_exponential
 
@@ -10,30 +17,175 @@ from app.config import get_settings
 from app.models.database import ScenarioType
 from app.utils.cache import get_cache
 from app.utils.redis_cache import get_redis_cache
-from app.utils.prompts import CLASSIFICATION_SYSTEM_PROMPT, CLASSIFICATION_USER_TEMPLATE
+from app.utils.prompts import (
+    CLASSIFICATION_BATCH_USER_TEMPLATE,
+    CLASSIFICATION_SYSTEM_PROMPT,
+    CLASSIFICATION_USER_TEMPLATE,
+)
 
 logger = logging.getLogger(__name__)
 
+# How long per-entry hit counters are kept (seconds)
+_HITS_TTL_SECONDS = 86400
+
+# Classifications currently waiting on the API, keyed by cache key
+_inflight: Dict[str, asyncio.Future] = {}
+
+# Hit-counter updates running detached from the cache-hit path
+_hit_tasks: Set[asyncio.Task] = set()
+
+# Scenario values accepted from the model
+_VALID_SCENARIOS = frozenset(s.value for s in ScenarioType) | {"UNKNOWN"}
+
+# Trivial whole-message greetings/farewells that never need the model.
+# Group names are the scenario values returned on a match.
+_FASTPATH = re.compile(
+    r"^(?:"
+    r"(?P<GREETING>привет|здравствуй(?:те)?|добрый (?:день|вечер)|доброе утро)"
+    r"|(?P<FAREWELL>спасибо(?: большое)?|благодарю|до свидания|всего доброго)"
+    r")[\s.!?…)]*$",
+    re.IGNORECASE,
+)
+
+
+_REPEATED_PUNCTUATION = re.compile(r"([!?.])\1+")
+
+
+def _normalize(message: str) -> str:
+    """Canonical form of a message for cache lookups (case, spacing, repeated !?.)"""
+    normalized = unicodedata.normalize("NFKC", message).strip().lower()
+    return _REPEATED_PUNCTUATION.sub(r"\1", normalized)
+
+
+def classification_cache_key(message: str) -> str:
+    """Cache key under which the classification of a message is stored"""
+    message_hash = hashlib.md5(_normalize(message).encode()).hexdigest()
+    return f"classification:{message_hash}"
+
+
+def _cache_ttl(confidence: float, hits: int) -> int:
+    """
+    TTL for a cached classification
+
+    Scales from 60s at zero confidence to 1h at full confidence, and is
+    extended up to 4x for entries that have been hit repeatedly.
+    """
+    ttl = 60 + 3540 * confidence
+    if hits > 1:
+        ttl *= min(4, 1 + math.log10(hits))
+    return int(ttl)
+
+
+@dataclass(frozen=True, slots=True)
+class ClassificationResult:
+    """Outcome of classifying a single client message"""
+
+    scenario: str
+    confidence: float
+    reasoning: str
+    success: bool
+    error: Optional[str]
+    model: str
+    client_id: Optional[str] = None
+
+    def to_cache(self) -> Dict:
+        """Client-independent form stored in the classification cache"""
+        data = asdict(self)
+        del data["client_id"]
+        return data
+
+
+class AIClassifierBatcher:
+    """
+    Micro-batches model calls for different messages
+
+    Calls submitted within window_seconds of the first one (or until
+    max_size are waiting) are sent to the API as a single request.
+    """
+
+    def __init__(self, classifier: "AIClassifier", window_seconds: float, max_size: int):
+        self._classifier = classifier
+        self.window_seconds = window_seconds
+        self.max_size = max_size
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, message: str) -> Dict:
+        """Model answer for one message, requested together with concurrent ones"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((message, future))
+        if len(self._pending) >= self.max_size:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_seconds, self._dispatch)
+        return await future
+
+    def _dispatch(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        messages = [message for message, _ in batch]
+        try:
+            if len(messages) == 1:
+                answers = [await self._classifier._request_one(messages[0])]
+            else:
+                answers = await self._classifier._request_batch(messages)
+        except Exception as e:
+            answers = [e] * len(batch)
+
+        for (_, future), answer in zip(batch, answers):
+            if future.done():
+                continue
+            if isinstance(answer, Exception):
+                future.set_exception(answer)
+            else:
+                future.set_result(answer)
+
 
 class AIClassifier:
     """Classify client messages using OpenAI API"""
 
     def __init__(self):
         settings = get_settings()
+        self.model = settings.openai_model
+        self.confidence_threshold = settings.ai_confidence_threshold
+        self.timeout = settings.ai_classification_timeout
+        self.max_tokens = settings.ai_max_tokens
+        self.max_message_chars = settings.ai_max_message_chars
+        # Explicit pool so keep-alive connections to the API are bounded and reused
         self.client = AsyncOpenAI(
             api_key=settings.openai_api_key,
             base_url=settings.openai_api_base,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_keepalive_connections=64, max_connections=128
+                ),
+                timeout=self.timeout,
+            ),
+        )
+        self._batcher = (
+            AIClassifierBatcher(
+                self, settings.ai_batch_window_ms / 1000, settings.ai_batch_max_size
+            )
+            if settings.ai_batch_window_ms > 0
+            else None
         )
-        self.model = settings.openai_model
-        self.confidence_threshold = settings.ai_confidence_threshold
-        self.timeout = settings.ai_classification_timeout
 
     @retry(
         stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10)
     )
     async def classify(
         self, message: str, client_id: Optional[str] = None, use_cache: bool = True
-    ) -> Dict[str, any]:
+    ) -> ClassificationResult:
         """
         Classify a client message into a scenario
 
@@ -42,67 +194,108 @@ class AIClassifier:
             client_id: Optional client ID for logging
 
         Returns:
-            {
-                "scenario": "GREETING|REFERRAL|...|UNKNOWN",
-                "confidence": 0.95,
-                "reasoning": "...",
-                "success": True|False,
-                "error": None|"error message"
-            }
+            ClassificationResult with scenario (GREETING|REFERRAL|...|UNKNOWN),
+            confidence (0-1), reasoning, success flag and error message
         """
+        # Trivial messages are classified locally
+        match = _FASTPATH.match(message.strip())
+        if match:
+            logger.debug("Fast-path classification %s: %.30s...", match.lastgroup, message)
+            return ClassificationResult(
+                scenario=match.lastgroup,
+                confidence=0.99,
+                reasoning="Matched fast-path keyword",
+                success=True,
+                error=None,
+                model="keyword_fastpath",
+                client_id=client_id,
+            )
+
         # Try Redis cache first, fallback to in-memory cache
         cache_key = None
         if use_cache:
-            message_hash = hashlib.md5(message.encode()).hexdigest()
-            cache_key = f"classification:{message_hash}"
+            cache_key = classification_cache_key(message)
 
             # Try Redis cache first
             try:
                 redis_cache = await get_redis_cache()
-                cached_result = await redis_cache.get(cache_key)
+                hits_key = f"{cache_key}:hits"
+                cached_result, hits = await redis_cache.get_many([cache_key, hits_key])
                 if cached_result is not None:
-                    logger.debug(f"Redis Cache HIT for classification: {message[:30]}...")
-                    cached_result["client_id"] = client_id
-                    return cached_result
+                    logger.debug("Redis Cache HIT for classification: %.30s...", message)
+                    # Frequently hit entries live longer; the hit is counted and
+                    # the TTL extended in the background so a hit costs one round trip
+                    ttl = _cache_ttl(
+                        float(cached_result.get("confidence", 0)), int(hits or 0) + 1
+                    )
+                    task = asyncio.create_task(
+                        redis_cache.record_hit(hits_key, _HITS_TTL_SECONDS, cache_key, ttl)
+                    )
+                    _hit_tasks.add(task)
+                    task.add_done_callback(_hit_tasks.discard)
+                    return ClassificationResult(**{**cached_result, "client_id": client_id})
             except Exception as e:
-                logger.debug(f"Redis cache unavailable, trying in-memory cache: {e}")
+                logger.debug("Redis cache unavailable, trying in-memory cache: %s", e)
 
             # Fallback to in-memory cache
             cache = get_cache()
             cached_result = cache.get(cache_key)
             if cached_result is not None:
-                logger.debug(f"In-memory Cache HIT for classification: {message[:30]}...")
-                cached_result["client_id"] = client_id
-                return cached_result
+                logger.debug("In-memory Cache HIT for classification: %.30s...", message)
+                return replace(cached_result, client_id=client_id)
+
+        if cache_key is None:
+            return await self._classify_uncached(message, client_id, use_cache, cache_key)
+
+        # Coalesce concurrent misses for the same message onto one API call
+        inflight = _inflight.get(cache_key)
+        if inflight is not None:
+            logger.debug("Joining in-flight classification: %.30s...", message)
+            try:
+                result = await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # The call we joined was cancelled; do our own
+                result = await self._classify_uncached(
+                    message, client_id, use_cache, cache_key
+                )
+            return replace(result, client_id=client_id)
 
+        future = asyncio.get_running_loop().create_future()
+        _inflight[cache_key] = future
         try:
-            logger.info(
-                f"Classifying message for client {client_id}: {message[:50]}..."
+            result = await self._classify_uncached(
+                message, client_id, use_cache, cache_key
             )
+            future.set_result(result)
+            return result
+        finally:
+            if not future.done():
+                future.cancel()
+            del _inflight[cache_key]
 
-            # Build user message
-            user_message = CLASSIFICATION_USER_TEMPLATE.format(message=message)
-
-            # Call OpenAI API with JSON mode
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": CLASSIFICATION_SYSTEM_PROMPT},
-                    {"role": "user", "content": user_message},
-                ],
-                temperature=0.3,  # Low temperature for consistent classification
-                response_format={"type": "json_object"},
-                timeout=self.timeout,
+    async def _classify_uncached(
+        self,
+        message: str,
+        client_id: Optional[str],
+        use_cache: bool,
+        cache_key: Optional[str],
+    ) -> ClassificationResult:
+        """Classify a message with the OpenAI API and cache the result"""
+        try:
+            logger.info(
+                "Classifying message for client %s: %.50s...", client_id, message
             )
 
-            # Parse response
-            response_text = response.choices[0].message.content
-            result = json.loads(response_text)
+            result = await self._request(message)
 
             # Validate response structure
-            if not self._validate_response(result):
-                logger.warning(f"Invalid response structure: {result}")
-                return self._error_response("Invalid response format from AI")
+            if not isinstance(result, dict) or not self._validate_response(result):
+                logger.warning("Invalid response structure: %s", result)
+                return self._error_response(
+                    "Invalid response format from AI", client_id
+                )
 
             # Extract values
             scenario = result.get("scenario", "UNKNOWN")
@@ -112,66 +305,172 @@ class AIClassifier:
             # Apply confidence threshold
             if confidence < self.confidence_threshold:
                 logger.debug(
-                    f"Confidence {confidence} below threshold {self.confidence_threshold}, "
-                    f"downgrading to UNKNOWN"
+                    "Confidence %s below threshold %s, downgrading to UNKNOWN",
+                    confidence,
+                    self.confidence_threshold,
                 )
                 scenario = "UNKNOWN"
 
             logger.info(
-                f"Classification result: scenario={scenario}, "
-                f"confidence={confidence}, client={client_id}"
+                "Classification result: scenario=%s, confidence=%s, client=%s",
+                scenario,
+                confidence,
+                client_id,
             )
 
-            result_dict = {
-                "scenario": scenario,
-                "confidence": confidence,
-                "reasoning": reasoning,
-                "success": True,
-                "error": None,
-                "model": self.model,
-            }
+            classification = ClassificationResult(
+                scenario=scenario,
+                confidence=confidence,
+                reasoning=reasoning,
+                success=True,
+                error=None,
+                model=self.model,
+                client_id=client_id,
+            )
 
             # Cache result (only for successful classifications with high confidence)
             if use_cache and confidence >= 0.8:
                 if cache_key is None:
-                    message_hash = hashlib.md5(message.encode()).hexdigest()
-                    cache_key = f"classification:{message_hash}"
+                    cache_key = classification_cache_key(message)
                 
                 # Try Redis cache first
                 try:
                     redis_cache = await get_redis_cache()
-                    await redis_cache.set(cache_key, result_dict, ttl_seconds=300)
-                    logger.debug(f"Cached classification in Redis: {message[:30]}...")
+                    ttl = _cache_ttl(confidence, 0)
+                    await redis_cache.set(
+                        cache_key, classification.to_cache(), ttl_seconds=ttl
+                    )
+                    logger.debug(
+                        "Cached classification in Redis for %ss: %.30s...", ttl, message
+                    )
                 except Exception as e:
-                    logger.debug(f"Redis cache unavailable, using in-memory cache: {e}")
+                    logger.debug("Redis cache unavailable, using in-memory cache: %s", e)
                     # Fallback to in-memory cache
                     cache = get_cache()
-                    cache.set(cache_key, result_dict, ttl_seconds=300)
-                    logger.debug(f"Cached classification in memory: {message[:30]}...")
+                    cache.set(
+                        cache_key,
+                        replace(classification, client_id=None),
+                        ttl_seconds=_cache_ttl(confidence, 0),
+                    )
+                    logger.debug("Cached classification in memory: %.30s...", message)
 
-            return result_dict
+            return classification
 
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse JSON from OpenAI: {e}")
-            return self._error_response(f"JSON parse error: {str(e)}")
+        except orjson.JSONDecodeError as e:
+            logger.error("Failed to parse JSON from OpenAI: %s", e)
+            return self._error_response(f"JSON parse error: {str(e)}", client_id)
 
         except Exception as e:
-            logger.error(f"Classification error: {type(e).__name__}: {str(e)}")
-            return self._error_response(f"Classification failed: {str(e)}")
+            logger.error("Classification error: %s: %s", type(e).__name__, e)
+            return self._error_response(
+                f"Classification failed: {str(e)}", client_id
+            )
+
+    async def _request(self, message: str) -> Dict:
+        """Parsed model answer for a message, batched with concurrent calls if enabled"""
+        if self._batcher is not None:
+            return await self._batcher.submit(message)
+        return await self._request_one(message)
+
+    async def _complete(self, user_message: str, max_tokens: int) -> Dict:
+        """Send one classification prompt and parse the JSON answer"""
+        # Call OpenAI API with JSON mode
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": CLASSIFICATION_SYSTEM_PROMPT},
+                {"role": "user", "content": user_message},
+            ],
+            temperature=0.3,  # Low temperature for consistent classification
+            response_format={"type": "json_object"},
+            max_tokens=max_tokens,
+            timeout=self.timeout,
+        )
+        return orjson.loads(response.choices[0].message.content)
+
+    async def _request_one(self, message: str) -> Dict:
+        # Very long messages are cut to bound prompt size
+        user_message = CLASSIFICATION_USER_TEMPLATE.format(
+            message=message[: self.max_message_chars]
+        )
+        return await self._complete(user_message, self.max_tokens)
+
+    async def _request_batch(self, messages: List[str]) -> List[Union[Dict, Exception]]:
+        """
+        Classify several messages with one API request
+
+        Messages go to the model as a JSON array of {"id", "message"} items,
+        so a message cannot pose as another one, and every result must echo
+        its item's id. Messages without exactly one valid result under their
+        id are retried with one request each.
+        """
+        items = orjson.dumps(
+            [
+                {"id": i, "message": message[: self.max_message_chars]}
+                for i, message in enumerate(messages)
+            ]
+        ).decode()
+        answers: List[Union[Dict, Exception, None]] = [None] * len(messages)
+        try:
+            answer = await self._complete(
+                CLASSIFICATION_BATCH_USER_TEMPLATE.format(messages=items),
+                self.max_tokens * len(messages),
+            )
+            results = answer.get("results") if isinstance(answer, dict) else None
+            if isinstance(results, list):
+                answers = self._match_batch_results(results, len(messages))
+        except orjson.JSONDecodeError as e:
+            logger.warning("Batched classification returned invalid JSON: %s", e)
+
+        missing = [i for i, answer in enumerate(answers) if answer is None]
+        if missing:
+            logger.warning(
+                "Batched classification left %d of %d messages unmatched, "
+                "retrying them individually",
+                len(missing),
+                len(messages),
+            )
+            retried = await asyncio.gather(
+                *(self._request_one(messages[i]) for i in missing),
+                return_exceptions=True,
+            )
+            for i, answer in zip(missing, retried):
+                answers[i] = answer
+        else:
+            logger.debug("Classified %d messages in one request", len(messages))
+        return answers
+
+    def _match_batch_results(self, results: List, count: int) -> List[Optional[Dict]]:
+        """Valid results by the id they echo; None where none or several match"""
+        matched: List[Optional[Dict]] = [None] * count
+        seen: Set[int] = set()
+        for item in results:
+            if not isinstance(item, dict):
+                continue
+            item_id = item.get("id")
+            if type(item_id) is not int or not 0 <= item_id < count:
+                continue
+            if item_id in seen:
+                # Ambiguous: neither answer can be trusted
+                matched[item_id] = None
+                continue
+            seen.add(item_id)
+            answer = {k: v for k, v in item.items() if k != "id"}
+            if self._validate_response(answer):
+                matched[item_id] = answer
+        return matched
 
     def _validate_response(self, response: Dict) -> bool:
         """Validate response has required fields"""
-        required_fields = ["scenario", "confidence", "reasoning"]
-
-        if not all(field in response for field in required_fields):
+        if (
+            "scenario" not in response
+            or "confidence" not in response
+            or "reasoning" not in response
+        ):
             return False
 
         # Validate scenario is valid
-        valid_scenarios = [s.value for s in ScenarioType]
-        if (
-            response["scenario"] not in valid_scenarios
-            and response["scenario"] != "UNKNOWN"
-        ):
+        if response["scenario"] not in _VALID_SCENARIOS:
             return False
 
         # Validate confidence is 0-1
@@ -184,13 +483,22 @@ class AIClassifier:
 
         return True
 
-    def _error_response(self, error_message: str) -> Dict[str, any]:
+    def _error_response(
+        self, error_message: str, client_id: Optional[str] = None
+    ) -> ClassificationResult:
         """Return error response"""
-        return {
-            "scenario": "UNKNOWN",
-            "confidence": 0,
-            "reasoning": error_message,
-            "success": False,
-            "error": error_message,
-            "model": self.model,
-        }
+        return ClassificationResult(
+            scenario="UNKNOWN",
+            confidence=0,
+            reasoning=error_message,
+            success=False,
+            error=error_message,
+            model=self.model,
+            client_id=client_id,
+        )
+
+
+@lru_cache()
+def get_classifier() -> AIClassifier:
+    """Shared classifier, so the OpenAI connection pool is reused across requests"""
+    return AIClassifier()
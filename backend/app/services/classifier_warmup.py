@@ -0,0 +1,60 @@
+"""
+Classification cache warmup
+Seeds the classification cache with the most frequent client messages so the
+first occurrence after a restart does not have to go through OpenAI.
+"""
+import logging
+from typing import Dict, Tuple
+
+from app.config import get_settings
+from app.services.ai_classifier import ClassificationResult, classification_cache_key
+from app.utils.redis_cache import get_redis_cache
+
+logger = logging.getLogger(__name__)
+
+# How long warmed entries live (seconds)
+WARMUP_TTL_SECONDS = 86400
+
+# Canonical high-frequency messages and their known classification.
+# Plain greetings/farewells are handled by the classifier's fast path.
+WARMUP_MESSAGES: Dict[str, Tuple[str, float]] = {
+    "Все понятно, спасибо": ("FAREWELL", 0.95),
+    "Хорошо, спасибо": ("FAREWELL", 0.95),
+    "Не могу зайти": ("TECH_SUPPORT_BASIC", 0.95),
+    "Не работает": ("TECH_SUPPORT_BASIC", 0.9),
+    "Тренер не пришел": ("MISSING_TRAINER", 0.95),
+}
+
+
+async def warm_classification_cache() -> int:
+    """
+    Store the pre-classified WARMUP_MESSAGES in the classification cache
+
+    Entries already cached (e.g. classified by the model before a restart)
+    are left as they are.
+
+    Returns:
+        Number of cache entries written
+    """
+    model = get_settings().openai_model
+    redis_cache = await get_redis_cache()
+
+    warmed = 0
+    for message, (scenario, confidence) in WARMUP_MESSAGES.items():
+        result = ClassificationResult(
+            scenario=scenario,
+            confidence=confidence,
+            reasoning="Pre-classified frequent message",
+            success=True,
+            error=None,
+            model=model,
+        )
+        if await redis_cache.add(
+            classification_cache_key(message),
+            result.to_cache(),
+            ttl_seconds=WARMUP_TTL_SECONDS,
+        ):
+            warmed += 1
+
+    logger.debug("Warmed classification cache with %d entries", warmed)
+    return warmed
@@ -2,12 +2,13 @@ import asyncio
 import logging
 import uuid
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
-from sqlalchemy import and_, select, update
+from sqlalchemy import and_, exists, func, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import get_settings
+from app.database import async_session_maker
 from app.models.database import (
     ChatSession,
     DialogStatus,
@@ -16,7 +17,8 @@ from app.models.database import (
     ScenarioType,
 )
 from app.services.response_manager import ResponseManager
-from app.services.webhook_sender import WebhookSender
+from app.services.webhook_queue import get_webhook_queue
+from app.services.webhook_sender import get_webhook_sender
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +30,14 @@ class DialogAutoCloseService:
         self.session = session
         self.inactivity_timeout_minutes = 3  # Close after 3 minutes of inactivity
         self.farewell_delay_minutes = 2  # Send farewell after 2 minutes
+        self.farewell_concurrency = 20  # Max farewells dispatched in parallel
+        self.farewell_batch_size = 500  # Clients loaded per farewell batch
+        # ChatSession rows already loaded through this service, by client_id
+        self._session_cache: Dict[str, ChatSession] = {}
+
+        settings = get_settings()
+        self._delays_enabled = settings.delays_enabled
+        self._farewell_delay_seconds = settings.farewell_delay_seconds
 
     async def get_or_create_session(
         self, 
@@ -37,10 +47,12 @@ class DialogAutoCloseService:
         chat_id: Optional[str] = None,
     ) -> ChatSession:
         """Get existing session or create a new one"""
-        result = await self.session.execute(
-            select(ChatSession).where(ChatSession.client_id == client_id)
-        )
-        session = result.scalar_one_or_none()
+        session = self._session_cache.get(client_id)
+        if session is None:
+            result = await self.session.execute(
+                select(ChatSession).where(ChatSession.client_id == client_id)
+            )
+            session = result.scalar_one_or_none()
 
         if not session:
             session = ChatSession(
@@ -54,7 +66,8 @@ class DialogAutoCloseService:
             )
             self.session.add(session)
             await self.session.flush()
-            logger.debug(f"Created new chat session for client {client_id}")
+            logger.debug("Created new chat session for client %s", client_id)
+            self._session_cache[client_id] = session
         else:
             # Update webhook info if provided (for existing sessions)
             if webhook_url is not None:
@@ -64,6 +77,7 @@ class DialogAutoCloseService:
             if chat_id is not None:
                 session.chat_id = chat_id
             await self.session.flush()
+            self._session_cache[client_id] = session
 
         return session
 
@@ -87,141 +101,253 @@ class DialogAutoCloseService:
             session.status = DialogStatus.OPEN
             session.closed_at = None
             session.farewell_sent_at = None
-            logger.info(f"Reopened closed session for client {client_id}")
+            self._session_cache.pop(client_id, None)
+            logger.info("Reopened closed session for client %s", client_id)
 
         session.last_activity_at = datetime.utcnow()
         await self.session.flush()
-        logger.debug(f"Updated activity for client {client_id}")
-
-    async def get_inactive_sessions(
-        self, minutes: Optional[int] = None
-    ) -> List[ChatSession]:
-        """Get sessions that have been inactive for specified minutes"""
-        if minutes is None:
-            minutes = self.inactivity_timeout_minutes
-
-        cutoff_time = datetime.utcnow() - timedelta(minutes=minutes)
+        logger.debug("Updated activity for client %s", client_id)
+
+    def _should_close_condition(self, now: datetime):
+        """SQL predicate matching open sessions that are due to be closed.
+
+        Only close sessions where:
+        1. Farewell was sent AND enough time has passed since farewell
+           (inactivity_timeout - farewell_delay, i.e. 1 minute after farewell = 3 minutes total)
+        2. OR no farewell was sent but timeout exceeded (fallback for edge cases)
+        """
+        activity_cutoff = now - timedelta(minutes=self.inactivity_timeout_minutes)
+        farewell_cutoff = now - timedelta(
+            minutes=self.inactivity_timeout_minutes - self.farewell_delay_minutes
+        )
+        return and_(
+            ChatSession.status == DialogStatus.OPEN,
+            ChatSession.last_activity_at <= activity_cutoff,
+            or_(
+                ChatSession.farewell_sent_at.is_(None),
+                ChatSession.farewell_sent_at <= farewell_cutoff,
+            ),
+        )
 
+    async def get_client_ids_needing_farewell(
+        self,
+        now: datetime,
+        after: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[str]:
+        """
+        One page of client ids that need a farewell, ordered by client_id
+
+        Args:
+            now: Reference time for the inactivity cutoff
+            after: Last client_id of the previous page (keyset pagination)
+            limit: Page size (defaults to farewell_batch_size)
+        """
+        cutoff_time = now - timedelta(minutes=self.farewell_delay_minutes)
+        query = select(ChatSession.client_id).where(
+            ChatSession.status == DialogStatus.OPEN,
+            ChatSession.last_activity_at <= cutoff_time,
+            ChatSession.farewell_sent_at.is_(None),
+        )
+        if after is not None:
+            query = query.where(ChatSession.client_id > after)
         result = await self.session.execute(
-            select(ChatSession).where(
-                and_(
-                    ChatSession.status == DialogStatus.OPEN,
-                    ChatSession.last_activity_at <= cutoff_time,
-                )
+            query.order_by(ChatSession.client_id).limit(
+                limit or self.farewell_batch_size
             )
         )
-
         return result.scalars().all()
 
-    async def get_sessions_needing_farewell(
-        self, minutes: Optional[int] = None
-    ) -> List[ChatSession]:
-        """Get open sessions that need farewell message"""
-        if minutes is None:
-            minutes = self.farewell_delay_minutes
-
-        cutoff_time = datetime.utcnow() - timedelta(minutes=minutes)
+    def _recent_farewell_condition(self, client_id, now: datetime):
+        """EXISTS predicate: a farewell went out to the client in the last minute"""
+        return exists().where(
+            Message.client_id == client_id,
+            Message.message_type == MessageType.BOT_AUTO,
+            Message.created_at >= now - timedelta(minutes=1),
+            func.lower(Message.content).like("%завершаем диалог%"),
+        )
 
-        result = await self.session.execute(
-            select(ChatSession).where(
-                and_(
-                    ChatSession.status == DialogStatus.OPEN,
-                    ChatSession.last_activity_at <= cutoff_time,
-                    ChatSession.farewell_sent_at.is_(None),
+    async def get_farewell_context(
+        self, client_ids: List[str], now: Optional[datetime] = None
+    ) -> Dict[str, Tuple[Optional[uuid.UUID], bool]]:
+        """
+        Last message id and recent-farewell flag for many clients in one query
+
+        Returns:
+            client_id -> (last_message_id, has_recent_farewell); clients with
+            no messages are absent
+        """
+        if not client_ids:
+            return {}
+        if now is None:
+            now = datetime.utcnow()
+
+        ranked = (
+            select(
+                Message.client_id,
+                Message.id,
+                func.row_number()
+                .over(
+                    partition_by=Message.client_id,
+                    order_by=Message.created_at.desc(),
                 )
+                .label("rn"),
+            )
+            .where(Message.client_id.in_(client_ids))
+            .subquery()
+        )
+        result = await self.session.execute(
+            select(
+                ranked.c.client_id,
+                ranked.c.id,
+                self._recent_farewell_condition(ranked.c.client_id, now),
+            ).where(ranked.c.rn == 1)
+        )
+        return {
+            client_id: (message_id, bool(has_recent_farewell))
+            for client_id, message_id, has_recent_farewell in result
+        }
+
+    async def _load_farewell_state(
+        self, client_id: str
+    ) -> Tuple[ChatSession, Optional[uuid.UUID], bool]:
+        """Fetch the session with its last message id and recent-farewell flag"""
+        # One round-trip. populate_existing makes the SELECT overwrite any
+        # stale state held in the identity map, so no separate refresh is needed.
+        last_message_q = (
+            select(Message.id)
+            .where(Message.client_id == client_id)
+            .order_by(Message.created_at.desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+        # Prevent concurrent sends: skip if a farewell went out in the last minute
+        recent_farewell_q = self._recent_farewell_condition(
+            client_id, datetime.utcnow()
+        )
+        result = await self.session.execute(
+            select(
+                ChatSession,
+                last_message_q.label("last_message_id"),
+                recent_farewell_q.label("recent_farewell"),
             )
+            .where(ChatSession.client_id == client_id)
+            .execution_options(populate_existing=True)
         )
+        row = result.one_or_none()
 
-        return result.scalars().all()
+        if row:
+            session, last_message_id, has_recent_farewell = row
+            self._session_cache[client_id] = session
+            return session, last_message_id, has_recent_farewell
+
+        session = await self.get_or_create_session(client_id)
+        result = await self.session.execute(
+            select(Message.id)
+            .where(Message.client_id == client_id)
+            .order_by(Message.created_at.desc())
+            .limit(1)
+        )
+        return session, result.scalar_one_or_none(), False
 
-    async def send_farewell_message(self, client_id: str) -> Optional[Dict]:
-        """Send farewell message to client with delay"""
+    async def send_farewell_message(
+        self,
+        client_id: str,
+        context: Optional[Tuple[Optional[uuid.UUID], bool]] = None,
+    ) -> Optional[Dict]:
+        """
+        Send farewell message to client with delay
+
+        Args:
+            client_id: Client to say goodbye to
+            context: (last_message_id, has_recent_farewell) prefetched by
+                get_farewell_context; no session lookup is made, the session
+                is claimed with a conditional UPDATE before the send instead
+        """
         try:
-            # Use a transaction to prevent race conditions
-            # Refresh session to get latest state
-            result = await self.session.execute(
-                select(ChatSession).where(ChatSession.client_id == client_id)
-            )
-            session = result.scalar_one_or_none()
-            
-            if not session:
-                session = await self.get_or_create_session(client_id)
+            if context is not None:
+                session = None
+                last_message_id, has_recent_farewell = context
             else:
-                # Refresh to get latest state (prevent race conditions)
-                await self.session.refresh(session)
+                session, last_message_id, has_recent_farewell = (
+                    await self._load_farewell_state(client_id)
+                )
+                # Check if farewell already sent
+                if session.farewell_sent_at:
+                    logger.debug("Farewell already sent for client %s", client_id)
+                    return None
 
-            # Check if farewell already sent (double-check after refresh)
-            if session.farewell_sent_at:
-                logger.debug(f"Farewell already sent for client {client_id} (checked after refresh)")
-                return None
-            
-            # Use a temporary flag to prevent concurrent sends
-            # We'll set farewell_sent_at only after successful send
-            # For now, check if there's already a farewell message in the last minute
-            recent_farewell_check = await self.session.execute(
-                select(Message)
-                .where(
-                    Message.client_id == client_id,
-                    Message.message_type == MessageType.BOT_AUTO,
-                    Message.created_at >= datetime.utcnow() - timedelta(minutes=1)
+            if has_recent_farewell:
+                logger.debug(
+                    "Recent farewell message found for client %s, skipping duplicate",
+                    client_id,
                 )
-                .order_by(Message.created_at.desc())
-                .limit(1)
-            )
-            recent_farewell = recent_farewell_check.scalar_one_or_none()
-            if recent_farewell and "завершаем диалог" in recent_farewell.content.lower():
-                logger.debug(f"Recent farewell message found for client {client_id}, skipping duplicate")
                 return None
 
-            # Get last message from client
-            result = await self.session.execute(
-                select(Message)
-                .where(Message.client_id == client_id)
-                .order_by(Message.created_at.desc())
-                .limit(1)
-            )
-            last_message = result.scalar_one_or_none()
-
-            if not last_message:
-                logger.warning(f"No messages found for client {client_id}")
+            if last_message_id is None:
+                logger.warning("No messages found for client %s", client_id)
                 return None
 
-            # Add delay before sending farewell (simulate natural conversation pause)
-            settings = get_settings()
-            if settings.delays_enabled and settings.farewell_delay_seconds > 0:
-                delay = settings.farewell_delay_seconds
+            # Claim the farewell before sending it: the page was read before
+            # the fan-out, so an overlapping run may have got here first
+            if session is None:
+                claim = await self.session.execute(
+                    update(ChatSession)
+                    .where(
+                        ChatSession.client_id == client_id,
+                        ChatSession.status == DialogStatus.OPEN,
+                        ChatSession.farewell_sent_at.is_(None),
+                    )
+                    .values(farewell_sent_at=datetime.utcnow())
+                    .execution_options(synchronize_session=False)
+                )
+                if claim.rowcount == 0:
+                    logger.debug("Farewell already sent for client %s", client_id)
+                    return None
+
+            # Delay before the farewell goes out (simulate natural conversation pause)
+            delay = 0.0
+            if self._delays_enabled and self._farewell_delay_seconds > 0:
+                delay = self._farewell_delay_seconds
                 logger.debug(
-                    f"⏳ Delaying farewell by {delay:.1f} seconds for client {client_id}"
+                    "⏳ Delaying farewell by %.1f seconds for client %s", delay, client_id
                 )
-                await asyncio.sleep(delay)
 
             # Create farewell response
             response_manager = ResponseManager(self.session)
             response_msg, response_text = await response_manager.create_bot_response(
                 scenario=ScenarioType.FAREWELL.value,
                 client_id=client_id,
-                original_message_id=str(last_message.id),
+                original_message_id=str(last_message_id),
                 message_type=MessageType.BOT_AUTO,
             )
 
             if not response_msg:
-                logger.error(f"Failed to create farewell response for {client_id}")
+                logger.error("Failed to create farewell response for %s", client_id)
                 return None
 
-            # Send via webhook
-            webhook_sender = WebhookSender()
-            webhook_result = await webhook_sender.send_response(
-                client_id=client_id,
-                response_text=response_text,
-                message_id=str(response_msg.id),
-                classification={"scenario": "FAREWELL", "confidence": 1.0},
-            )
+            # Send via webhook: the background queue holds the farewell until
+            # its delay has passed; without it, wait here and deliver inline
+            webhook_sender = get_webhook_sender()
+            webhook_kwargs = {
+                "client_id": client_id,
+                "response_text": response_text,
+                "message_id": str(response_msg.id),
+                "classification": {"scenario": "FAREWELL", "confidence": 1.0},
+            }
+            if get_webhook_queue().enqueue(webhook_sender, **webhook_kwargs, delay=delay):
+                webhook_result = {"queued": True}
+            else:
+                if delay:
+                    await asyncio.sleep(delay)
+                webhook_result = await webhook_sender.send_response(**webhook_kwargs)
 
-            # Update farewell timestamp (already set above as lock, but update after successful send)
-            session.farewell_sent_at = datetime.utcnow()
-            await self.session.flush()
+            # Update farewell timestamp (already claimed above without a session)
+            if session is not None:
+                session.farewell_sent_at = datetime.utcnow()
+                await self.session.flush()
 
-            logger.info(f"Sent farewell message to client {client_id}")
+            logger.info("Sent farewell message to client %s", client_id)
 
             return {
                 "success": True,
@@ -231,7 +357,7 @@ class DialogAutoCloseService:
 
         except Exception as e:
             logger.error(
-                f"Error sending farewell to {client_id}: {str(e)}", exc_info=True
+                "Error sending farewell to %s: %s", client_id, e, exc_info=True
             )
             return {"success": False, "error": str(e)}
 
@@ -241,80 +367,110 @@ class DialogAutoCloseService:
             session = await self.get_or_create_session(client_id)
 
             if session.status == DialogStatus.CLOSED:
-                logger.debug(f"Session already closed for client {client_id}")
+                logger.debug("Session already closed for client %s", client_id)
                 return True
 
             session.status = DialogStatus.CLOSED
             session.closed_at = datetime.utcnow()
             await self.session.flush()
+            self._session_cache.pop(client_id, None)
 
-            logger.info(f"Closed session for client {client_id}")
+            logger.info("Closed session for client %s", client_id)
             return True
 
         except Exception as e:
             logger.error(
-                f"Error closing session for {client_id}: {str(e)}", exc_info=True
+                "Error closing session for %s: %s", client_id, e, exc_info=True
             )
             return False
 
     async def process_inactive_sessions(self) -> Dict[str, int]:
         """Process all inactive sessions: send farewell and close"""
         stats = {"farewell_sent": 0, "sessions_closed": 0, "errors": 0}
+        # One reference time for both passes
+        now = datetime.utcnow()
 
-        # First, send farewell to sessions that need it
-        sessions_needing_farewell = await self.get_sessions_needing_farewell()
+        # Each farewell calls a webhook, so run them concurrently (bounded),
+        # each on its own AsyncSession
+        semaphore = asyncio.Semaphore(self.farewell_concurrency)
+
+        async def send_one(
+            client_id: str, context: Tuple[Optional[uuid.UUID], bool]
+        ) -> Optional[Dict]:
+            async with semaphore:
+                async with async_session_maker() as task_session:
+                    service = DialogAutoCloseService(task_session)
+                    result = await service.send_farewell_message(
+                        client_id, context=context
+                    )
+                    # The farewell was claimed before sending, so keep the
+                    # claim only if it actually went out; otherwise retry later
+                    if result and result.get("success"):
+                        await task_session.commit()
+                    else:
+                        await task_session.rollback()
+                    return result
+
+        # First, send farewell to sessions that need it, one page of clients at
+        # a time so a large backlog is never loaded into memory at once. Each
+        # page's last message ids and recent-farewell flags come in one query
+        last_client_id = None
+        while True:
+            client_ids = await self.get_client_ids_needing_farewell(
+                now, after=last_client_id
+            )
+            if not client_ids:
+                break
+            contexts = await self.get_farewell_context(client_ids, now=now)
+
+            # Release the read transaction before fanning out to task sessions
+            await self.session.commit()
+
+            results = await asyncio.gather(
+                *(
+                    send_one(client_id, contexts.get(client_id, (None, False)))
+                    for client_id in client_ids
+                ),
+                return_exceptions=True,
+            )
 
-        for session in sessions_needing_farewell:
-            result = await self.send_farewell_message(session.client_id)
-            if result and result.get("success"):
-                stats["farewell_sent"] += 1
-            else:
-                stats["errors"] += 1
+            for client_id, result in zip(client_ids, results):
+                if isinstance(result, Exception):
+                    logger.error("Error sending farewell to %s: %s", client_id, result)
+                    stats["errors"] += 1
+                elif result and result.get("success"):
+                    stats["farewell_sent"] += 1
+                else:
+                    stats["errors"] += 1
 
-        await self.session.commit()
+            if len(client_ids) < self.farewell_batch_size:
+                break
+            last_client_id = client_ids[-1]
 
-        # Then, close sessions that have been inactive long enough
-        # Only close sessions where:
-        # 1. Farewell was sent AND enough time has passed since farewell (1 minute after farewell = 3 minutes total)
-        # 2. OR no farewell was sent but timeout exceeded (fallback for edge cases)
-        inactive_sessions = await self.get_inactive_sessions()
-        now = datetime.utcnow()
+        # Farewell timestamps were written by the task sessions and the close
+        # UPDATE below bypasses the identity map; drop our now-stale copies
+        self.session.expire_all()
+        self._session_cache.clear()
 
-        for session in inactive_sessions:
-            should_close = False
-
-            if session.farewell_sent_at:
-                # Farewell was sent - close only if enough time passed since farewell
-                # We sent farewell at farewell_delay_minutes (2 min), so we need to wait
-                # additional (inactivity_timeout_minutes - farewell_delay_minutes) = 1 minute
-                time_since_farewell = (
-                    now - session.farewell_sent_at
-                ).total_seconds() / 60
-                time_since_activity = (
-                    now - session.last_activity_at
-                ).total_seconds() / 60
-
-                # Close if farewell was sent AND total inactivity >= timeout
-                should_close = (
-                    time_since_farewell
-                    >= (self.inactivity_timeout_minutes - self.farewell_delay_minutes)
-                    and time_since_activity >= self.inactivity_timeout_minutes
-                )
-            else:
-                # No farewell sent - close if timeout exceeded (fallback case)
-                time_since_activity = (
-                    now - session.last_activity_at
-                ).total_seconds() / 60
-                should_close = time_since_activity >= self.inactivity_timeout_minutes
-
-            if should_close:
-                success = await self.close_session(session.client_id)
-                if success:
-                    stats["sessions_closed"] += 1
-                else:
-                    stats["errors"] += 1
+        # Then, close sessions that have been inactive long enough.
+        # The selection and the close happen in a single UPDATE
+        try:
+            result = await self.session.execute(
+                update(ChatSession)
+                .where(self._should_close_condition(now))
+                .values(status=DialogStatus.CLOSED, closed_at=now)
+                .returning(ChatSession.client_id)
+                .execution_options(synchronize_session=False)
+            )
+            closed_client_ids = result.scalars().all()
+            stats["sessions_closed"] = len(closed_client_ids)
+            if closed_client_ids:
+                logger.info("Closed inactive sessions for clients: %s", closed_client_ids)
+        except Exception as e:
+            logger.error("Error closing inactive sessions: %s", e, exc_info=True)
+            stats["errors"] += 1
 
         await self.session.commit()
 
-        logger.info(f"Processed inactive sessions: {stats}")
+        logger.info("Processed inactive sessions: %s", stats)
         return stats
@@ -2,9 +2,9 @@ import logging
 import uuid
 from datetime import datetime, timedelta
 from enum import Enum
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
-from sqlalchemy import and_, select
+from sqlalchemy import and_, distinct, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.database import Classification, Message, MessageType, ScenarioType
@@ -19,6 +19,15 @@ class EscalationLevel(str, Enum):
     CRITICAL = "critical"
 
 
+# Priority queue position per escalation level (1 is highest)
+_PRIORITY_QUEUE: Dict[EscalationLevel, int] = {
+    EscalationLevel.LOW: 10,
+    EscalationLevel.MEDIUM: 7,
+    EscalationLevel.HIGH: 3,
+    EscalationLevel.CRITICAL: 1,
+}
+
+
 class EscalationReason(str, Enum):
     LOW_CONFIDENCE = "low_confidence"
     REPEATED_FAILED = "repeated_failed"
@@ -62,16 +71,18 @@ class EscalationManager:
             reasons.append(EscalationReason.UNKNOWN_SCENARIO)
             base_level = EscalationLevel.HIGH
 
-        # Check 3: Repeated failures from same client
-        recent_failures = await self._get_recent_failures(client_id, hours=2)
+        recent_failures, recent_requests, has_recent_escalations = (
+            await self._get_recent_activity(client_id)
+        )
+
+        # Check 3: Repeated failures from same client (last 2 hours)
         if recent_failures >= 2:
             reasons.append(EscalationReason.REPEATED_FAILED)
             base_level = (
                 EscalationLevel.HIGH if len(reasons) > 1 else EscalationLevel.MEDIUM
             )
 
-        # Check 3.5: Repeated requests in short time (new trigger)
-        recent_requests = await self._get_recent_requests(client_id, minutes=10)
+        # Check 3.5: Repeated requests in short time (new trigger, last 10 minutes)
         if recent_requests >= 3:
             reasons.append(EscalationReason.REPEATED_FAILED)
             base_level = EscalationLevel.HIGH
@@ -80,8 +91,8 @@ class EscalationManager:
                 f"messages in last 10 minutes - escalating"
             )
 
-        # Check 4: Check if client has complaints
-        if await self._has_recent_escalations(client_id, hours=1):
+        # Check 4: Check if client has complaints (escalated in the last hour)
+        if has_recent_escalations:
             reasons.append(EscalationReason.COMPLAINT)
             base_level = EscalationLevel.CRITICAL
 
@@ -93,62 +104,61 @@ class EscalationManager:
             "confidence": confidence,
         }
 
-    async def _get_recent_requests(self, client_id: str, minutes: int = 10) -> int:
-        """Count recent messages from client (for repeated requests trigger)"""
-        cutoff_time = datetime.utcnow() - timedelta(minutes=minutes)
-
-        result = await self.session.execute(
-            select(Message).where(
-                and_(
-                    Message.client_id == client_id,
-                    Message.created_at >= cutoff_time,
-                    Message.message_type == MessageType.USER,
-                )
-            )
-        )
-
-        return len(result.scalars().all())
+    async def _get_recent_activity(
+        self,
+        client_id: str,
+        failures_hours: int = 2,
+        requests_minutes: int = 10,
+        escalations_hours: int = 1,
+    ) -> Tuple[int, int, bool]:
+        """
+        Collect the client's recent history in a single query
 
-    async def _get_recent_failures(self, client_id: str, hours: int = 2) -> int:
-        """Count classifications with low confidence for client"""
-        cutoff_time = datetime.utcnow() - timedelta(hours=hours)
+        Returns:
+            (low-confidence classifications in the last failures_hours,
+             client messages in the last requests_minutes,
+             whether the client was escalated in the last escalations_hours)
+        """
+        now = datetime.utcnow()
+        failures_cutoff = now - timedelta(hours=failures_hours)
+        requests_cutoff = now - timedelta(minutes=requests_minutes)
+        escalations_cutoff = now - timedelta(hours=escalations_hours)
+        window_start = min(failures_cutoff, requests_cutoff, escalations_cutoff)
 
         result = await self.session.execute(
-            select(Classification)
-            .join(Message)
-            .where(
-                and_(
-                    Message.client_id == client_id,
-                    Classification.created_at >= cutoff_time,
-                    Classification.confidence < 0.70,
-                )
+            select(
+                func.count(Classification.id).filter(
+                    and_(
+                        Classification.created_at >= failures_cutoff,
+                        Classification.confidence < 0.70,
+                    )
+                ),
+                func.count(distinct(Message.id)).filter(
+                    and_(
+                        Message.message_type == MessageType.USER,
+                        Message.created_at >= requests_cutoff,
+                    )
+                ),
+                func.count(distinct(Message.id)).filter(
+                    and_(
+                        Message.message_type == MessageType.BOT_ESCALATED,
+                        Message.created_at >= escalations_cutoff,
+                    )
+                ),
             )
-        )
-
-        return len(result.scalars().all())
-
-    async def _has_recent_escalations(self, client_id: str, hours: int = 1) -> bool:
-        """Check if client has recent escalations"""
-        cutoff_time = datetime.utcnow() - timedelta(hours=hours)
-
-        result = await self.session.execute(
-            select(Message).where(
+            .select_from(Message)
+            .outerjoin(Classification, Classification.message_id == Message.id)
+            .where(
                 and_(
                     Message.client_id == client_id,
-                    Message.message_type == MessageType.BOT_ESCALATED,
-                    Message.created_at >= cutoff_time,
+                    Message.created_at >= window_start,
                 )
             )
         )
+        failures, requests, escalations = result.one()
 
-        return len(result.scalars().all()) > 0
+        return failures, requests, escalations > 0
 
     def _get_priority_queue(self, level: EscalationLevel) -> int:
         """Get priority queue position (1 is highest)"""
-        priority_map = {
-            EscalationLevel.LOW: 10,
-            EscalationLevel.MEDIUM: 7,
-            EscalationLevel.HIGH: 3,
-            EscalationLevel.CRITICAL: 1,
-        }
-        return priority_map.get(level, 10)
+        return _PRIORITY_QUEUE.get(level, 10)
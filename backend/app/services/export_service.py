@@ -3,15 +3,26 @@ import json
 import logging
 from datetime import datetime
 from io import BytesIO, StringIO
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Dict, List, Optional
 
-from sqlalchemy import and_, select
+import orjson
+from sqlalchemy import and_, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.database import Classification, Message, OperatorFeedback
+from app.models.database import (
+    Classification,
+    Message,
+    MessageType,
+    OperatorFeedback,
+    ScenarioType,
+)
 
 logger = logging.getLogger(__name__)
 
+# Export labels per enum member, built once instead of str(member.value) per row
+_MESSAGE_TYPE_LABELS: Dict[MessageType, str] = {m: str(m.value) for m in MessageType}
+_SCENARIO_LABELS: Dict[ScenarioType, str] = {s: str(s.value) for s in ScenarioType}
+
 
 class ExportService:
     """Export data in various formats"""
@@ -19,26 +30,32 @@ class ExportService:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def export_dialog_csv(self, client_id: str) -> str:
-        """Export client dialog as CSV"""
+    async def export_dialog_csv(
+        self, client_id: str, batch_size: int = 500
+    ) -> AsyncIterator[str]:
+        """
+        Export client dialog as CSV
 
-        # Get messages
-        msg_result = await self.session.execute(
-            select(Message)
+        Yields the CSV in chunks of up to batch_size rows, so a long dialog is
+        never held in memory as one string.
+        """
+        # Messages and their classifications in one streamed query
+        stream = await self.session.stream(
+            select(
+                Message.id,
+                Message.created_at,
+                Message.message_type,
+                Message.content,
+                Classification.detected_scenario,
+                Classification.confidence,
+                Classification.reasoning,
+            )
+            .outerjoin(Classification, Classification.message_id == Message.id)
             .where(Message.client_id == client_id)
-            .order_by(Message.created_at)
-        )
-        messages = msg_result.scalars().all()
-
-        # Get classifications
-        class_result = await self.session.execute(
-            select(Classification).join(Message).where(Message.client_id == client_id)
+            .order_by(Message.created_at, Message.id, Classification.created_at.desc())
+            .execution_options(yield_per=batch_size)
         )
-        classifications_dict = {
-            str(c.message_id): c for c in class_result.scalars().all()
-        }
 
-        # Build CSV
         output = StringIO()
         writer = csv.writer(output)
         writer.writerow(
@@ -52,128 +69,184 @@ class ExportService:
             ]
         )
 
-        for msg in messages:
-            classification = classifications_dict.get(str(msg.id))
+        rows_buffered = 0
+        previous_id = None
+        async for row in stream:
+            # One row per message, with its latest classification
+            if row.id == previous_id:
+                continue
+            previous_id = row.id
+
+            classified = row.detected_scenario is not None
             writer.writerow(
                 [
-                    msg.created_at.isoformat(),
-                    str(msg.message_type.value),
-                    msg.content,
-                    str(classification.detected_scenario.value)
-                    if classification
-                    else "N/A",
-                    f"{classification.confidence:.2%}" if classification else "N/A",
-                    classification.reasoning or "" if classification else "",
+                    row.created_at.isoformat(),
+                    _MESSAGE_TYPE_LABELS[row.message_type],
+                    row.content,
+                    _SCENARIO_LABELS[row.detected_scenario] if classified else "N/A",
+                    f"{row.confidence:.2%}" if classified else "N/A",
+                    row.reasoning or "" if classified else "",
                 ]
             )
+            rows_buffered += 1
+            if rows_buffered >= batch_size:
+                yield output.getvalue()
+                output.seek(0)
+                output.truncate(0)
+                rows_buffered = 0
 
-        return output.getvalue()
-
-    async def export_dialog_json(self, client_id: str) -> Dict:
-        """Export client dialog as JSON"""
+        yield output.getvalue()
 
-        msg_result = await self.session.execute(
-            select(Message)
+    async def _iter_dialog_messages(
+        self, client_id: str, batch_size: int = 500
+    ) -> AsyncIterator[Dict]:
+        """Yield the JSON export entry of each message in a dialog, oldest first"""
+        # Messages with their classifications and feedback in one streamed query
+        stream = await self.session.stream(
+            select(
+                Message.id,
+                Message.created_at,
+                Message.message_type,
+                Message.content,
+                Classification.detected_scenario,
+                Classification.confidence,
+                Classification.reasoning,
+                OperatorFeedback.feedback_type,
+                OperatorFeedback.suggested_scenario,
+                OperatorFeedback.comment,
+            )
+            .outerjoin(Classification, Classification.message_id == Message.id)
+            .outerjoin(OperatorFeedback, OperatorFeedback.message_id == Message.id)
             .where(Message.client_id == client_id)
-            .order_by(Message.created_at)
+            .order_by(
+                Message.created_at,
+                Message.id,
+                Classification.created_at.desc(),
+                OperatorFeedback.created_at.desc(),
+            )
+            .execution_options(yield_per=batch_size)
         )
-        messages = msg_result.scalars().all()
 
-        class_result = await self.session.execute(
-            select(Classification).join(Message).where(Message.client_id == client_id)
-        )
-        classifications_dict = {
-            str(c.message_id): c for c in class_result.scalars().all()
-        }
+        previous_id = None
+        async for row in stream:
+            # One entry per message, with its latest classification and feedback
+            if row.id == previous_id:
+                continue
+            previous_id = row.id
 
-        feedback_result = await self.session.execute(
-            select(OperatorFeedback).join(Message).where(Message.client_id == client_id)
-        )
-        feedbacks_dict = {str(f.message_id): f for f in feedback_result.scalars().all()}
+            yield {
+                "id": str(row.id),
+                "timestamp": row.created_at.isoformat(),
+                "type": _MESSAGE_TYPE_LABELS[row.message_type],
+                "content": row.content,
+                "classification": (
+                    {
+                        "scenario": _SCENARIO_LABELS[row.detected_scenario],
+                        "confidence": row.confidence,
+                        "reasoning": row.reasoning,
+                    }
+                    if row.detected_scenario is not None
+                    else None
+                ),
+                "feedback": (
+                    {
+                        "type": row.feedback_type,
+                        "suggested": _SCENARIO_LABELS[row.suggested_scenario]
+                        if row.suggested_scenario
+                        else None,
+                        "comment": row.comment,
+                    }
+                    if row.feedback_type is not None
+                    else None
+                ),
+            }
+
+    async def export_dialog_json(self, client_id: str) -> Dict:
+        """Export client dialog as JSON"""
+        messages = [entry async for entry in self._iter_dialog_messages(client_id)]
 
         return {
             "client_id": client_id,
             "exported_at": datetime.utcnow().isoformat(),
             "message_count": len(messages),
-            "messages": [
-                {
-                    "id": str(msg.id),
-                    "timestamp": msg.created_at.isoformat(),
-                    "type": str(msg.message_type.value),
-                    "content": msg.content,
-                    "classification": (
-                        {
-                            "scenario": str(
-                                classifications_dict[
-                                    str(msg.id)
-                                ].detected_scenario.value
-                            ),
-                            "confidence": classifications_dict[str(msg.id)].confidence,
-                            "reasoning": classifications_dict[str(msg.id)].reasoning,
-                        }
-                        if str(msg.id) in classifications_dict
-                        else None
-                    ),
-                    "feedback": (
-                        {
-                            "type": feedbacks_dict[str(msg.id)].feedback_type,
-                            "suggested": str(
-                                feedbacks_dict[str(msg.id)].suggested_scenario.value
-                            )
-                            if feedbacks_dict[str(msg.id)].suggested_scenario
-                            else None,
-                            "comment": feedbacks_dict[str(msg.id)].comment,
-                        }
-                        if str(msg.id) in feedbacks_dict
-                        else None
-                    ),
-                }
-                for msg in messages
-            ],
+            "messages": messages,
         }
 
+    async def stream_dialog_json(
+        self, client_id: str, batch_size: int = 500
+    ) -> AsyncIterator[bytes]:
+        """
+        Export client dialog as a JSON document, encoded incrementally
+
+        Same document as export_dialog_json, except message_count comes after
+        the messages array since it is only known once they have all been read.
+        """
+        header = {"client_id": client_id, "exported_at": datetime.utcnow().isoformat()}
+        # Reopen the header object to append the messages array to it
+        yield orjson.dumps(header)[:-1] + b',"messages":['
+
+        message_count = 0
+        batch: List[bytes] = []
+        async for entry in self._iter_dialog_messages(client_id, batch_size):
+            batch.append(orjson.dumps(entry))
+            if len(batch) >= batch_size:
+                yield (b"," if message_count else b"") + b",".join(batch)
+                message_count += len(batch)
+                batch = []
+
+        if batch:
+            yield (b"," if message_count else b"") + b",".join(batch)
+            message_count += len(batch)
+        yield b'],"message_count":' + orjson.dumps(message_count) + b"}"
+
     async def export_analytics_report(self, hours: int = 24) -> Dict:
         """Generate analytics report"""
         from datetime import timedelta
 
         cutoff_time = datetime.utcnow() - timedelta(hours=hours)
 
-        # Message stats
-        msg_result = await self.session.execute(
-            select(Message).where(Message.created_at >= cutoff_time)
+        # Message counts by type
+        type_result = await self.session.execute(
+            select(Message.message_type, func.count())
+            .where(Message.created_at >= cutoff_time)
+            .group_by(Message.message_type)
         )
-        messages = msg_result.scalars().all()
+        type_counts = {
+            _MESSAGE_TYPE_LABELS[msg_type]: count
+            for msg_type, count in type_result.all()
+        }
+        message_total = sum(type_counts.values())
 
-        # Classification stats
-        class_result = await self.session.execute(
-            select(Classification)
+        # Classification counts and confidence sums by scenario
+        scenario_result = await self.session.execute(
+            select(
+                Classification.detected_scenario,
+                func.count(),
+                func.sum(Classification.confidence),
+            )
             .join(Message)
             .where(Message.created_at >= cutoff_time)
+            .group_by(Classification.detected_scenario)
         )
-        classifications = class_result.scalars().all()
+        scenario_counts = {}
+        classification_total = 0
+        confidence_sum = 0.0
+        for scenario, count, scenario_confidence in scenario_result.all():
+            scenario_counts[_SCENARIO_LABELS[scenario]] = count
+            classification_total += count
+            confidence_sum += scenario_confidence or 0.0
 
-        # Feedback stats
+        # Feedback counts by type
         feedback_result = await self.session.execute(
-            select(OperatorFeedback)
+            select(OperatorFeedback.feedback_type, func.count())
             .join(Message)
             .where(Message.created_at >= cutoff_time)
+            .group_by(OperatorFeedback.feedback_type)
         )
-        feedbacks = feedback_result.scalars().all()
-
-        correct_feedback = sum(1 for f in feedbacks if f.feedback_type == "correct")
-        incorrect_feedback = sum(1 for f in feedbacks if f.feedback_type == "incorrect")
-
-        # Group by scenario
-        scenario_counts = {}
-        for c in classifications:
-            scenario = str(c.detected_scenario.value)
-            scenario_counts[scenario] = scenario_counts.get(scenario, 0) + 1
-
-        # Group by message type
-        type_counts = {}
-        for m in messages:
-            msg_type = str(m.message_type.value)
-            type_counts[msg_type] = type_counts.get(msg_type, 0) + 1
+        feedback_counts = dict(feedback_result.tuples().all())
+        feedback_total = sum(feedback_counts.values())
+        correct_feedback = feedback_counts.get("correct", 0)
+        incorrect_feedback = feedback_counts.get("incorrect", 0)
 
         return {
             "period": {
@@ -181,19 +254,20 @@ class ExportService:
                 "start": cutoff_time.isoformat(),
                 "end": datetime.utcnow().isoformat(),
             },
-            "messages": {"total": len(messages), "by_type": type_counts},
+            "messages": {"total": message_total, "by_type": type_counts},
             "classifications": {
-                "total": len(classifications),
-                "avg_confidence": sum(c.confidence for c in classifications)
-                / len(classifications)
-                if classifications
+                "total": classification_total,
+                "avg_confidence": confidence_sum / classification_total
+                if classification_total
                 else 0,
                 "by_scenario": scenario_counts,
             },
             "feedback": {
-                "total": len(feedbacks),
+                "total": feedback_total,
                 "correct": correct_feedback,
                 "incorrect": incorrect_feedback,
-                "accuracy_rate": correct_feedback / len(feedbacks) if feedbacks else 0,
+                "accuracy_rate": correct_feedback / feedback_total
+                if feedback_total
+                else 0,
             },
         }
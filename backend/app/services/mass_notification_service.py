@@ -2,19 +2,23 @@
 Mass Notification Service
 Handles mass notifications to all active clients (e.g., during mass outages)
 """
+import asyncio
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set, Tuple
 
 from sqlalchemy import and_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.database import ChatSession, DialogStatus, Message, MessageType
+from app.models.database import ChatSession, DialogStatus, MessageType
 from app.services.response_manager import ResponseManager
-from app.services.webhook_sender import WebhookSender
+from app.services.webhook_sender import get_webhook_sender
 
 logger = logging.getLogger(__name__)
 
+# Max webhooks in flight during a mass notification
+WEBHOOK_CONCURRENCY = 50
+
 
 class MassNotificationService:
     """Service for sending mass notifications to active clients"""
@@ -22,7 +26,7 @@ class MassNotificationService:
     def __init__(self, session: AsyncSession):
         self.session = session
         self.response_manager = ResponseManager(session)
-        self.webhook_sender = WebhookSender()
+        self.webhook_sender = get_webhook_sender()
 
     async def get_active_clients(
         self, hours_active: int = 24
@@ -82,56 +86,52 @@ class MassNotificationService:
         
         sent_count = 0
         failed_count = 0
-        
-        # Create notification message for each client
-        for client_id in client_ids:
-            try:
-                # Get last message from client (for context)
-                result = await self.session.execute(
-                    select(Message)
-                    .where(Message.client_id == client_id)
-                    .order_by(Message.created_at.desc())
-                    .limit(1)
-                )
-                last_message = result.scalar_one_or_none()
-                
-                # Create mass outage response message
-                response_msg, response_text = await self.response_manager.create_bot_response(
-                    scenario="MASS_OUTAGE",
+
+        # Create every client's notification message in one batched INSERT
+        response_msgs, response_text = await self.response_manager.create_bot_responses(
+            scenario="MASS_OUTAGE",
+            client_ids=client_ids,
+            params={},
+            message_type=MessageType.BOT_AUTO,
+        )
+        if not response_msgs:
+            failed_count = len(client_ids)
+            logger.error(f"❌ Failed to create mass outage responses: {response_text}")
+        pending: List[Tuple[str, str, str]] = [
+            (msg.client_id, response_text, str(msg.id)) for msg in response_msgs
+        ]
+
+        # Send via webhook: network-bound, so fan out with bounded concurrency
+        semaphore = asyncio.Semaphore(WEBHOOK_CONCURRENCY)
+
+        async def send_one(client_id: str, response_text: str, message_id: str) -> Dict:
+            async with semaphore:
+                return await self.webhook_sender.send_response(
                     client_id=client_id,
-                    original_message_id=str(last_message.id) if last_message else None,
-                    params={},
-                    message_type=MessageType.BOT_AUTO,
+                    response_text=response_text,
+                    message_id=message_id,
+                    classification=None,
                 )
-                
-                if response_msg:
-                    # Send via webhook
-                    webhook_result = await self.webhook_sender.send_response(
-                        client_id=client_id,
-                        response_text=response_text,
-                        message_id=str(response_msg.id),
-                        classification=None,
-                    )
-                    
-                    if webhook_result.get("success"):
-                        sent_count += 1
-                        logger.debug(f"✅ Sent mass outage notification to {client_id}")
-                    else:
-                        failed_count += 1
-                        logger.warning(
-                            f"⚠️ Failed to send mass outage notification to {client_id}: "
-                            f"{webhook_result.get('error')}"
-                        )
-                else:
-                    failed_count += 1
-                    logger.error(f"❌ Failed to create mass outage response for {client_id}")
-                    
-            except Exception as e:
+
+        webhook_results = await asyncio.gather(
+            *(send_one(*item) for item in pending), return_exceptions=True
+        )
+
+        for (client_id, _, _), webhook_result in zip(pending, webhook_results):
+            if isinstance(webhook_result, Exception):
                 failed_count += 1
                 logger.error(
                     f"❌ Error sending mass outage notification to {client_id}: "
-                    f"{type(e).__name__}: {str(e)}",
-                    exc_info=True,
+                    f"{type(webhook_result).__name__}: {str(webhook_result)}"
+                )
+            elif webhook_result.get("success"):
+                sent_count += 1
+                logger.debug(f"✅ Sent mass outage notification to {client_id}")
+            else:
+                failed_count += 1
+                logger.warning(
+                    f"⚠️ Failed to send mass outage notification to {client_id}: "
+                    f"{webhook_result.get('error')}"
                 )
         
         result = {
@@ -149,3 +149,86 @@ class MassNotificationService:
         
         return result
 
+
+
+class MassNotificationDispatcher:
+    """
+    Coalesce mass-notification triggers that arrive close together
+
+    During an outage many incoming messages cross the detection threshold
+    within seconds of each other. The first trigger opens a short collection
+    window; triggers arriving inside it merge into the same batch and all of
+    them await its single send.
+    """
+
+    def __init__(self, window_seconds: float = 2.0):
+        """
+        Initialize MassNotificationDispatcher
+
+        Args:
+            window_seconds: How long the first trigger waits for others to merge
+        """
+        self.window_seconds = window_seconds
+        # Batch still accepting triggers: (result future, client ids or None for all)
+        self._collecting: Optional[Tuple[asyncio.Future, Optional[Set[str]]]] = None
+
+    async def notify(self, client_ids: Optional[List[str]] = None) -> Dict[str, any]:
+        """
+        Request a mass outage notification
+
+        Args:
+            client_ids: Specific clients to notify, or None for all active clients
+
+        Returns:
+            Statistics of the batched send this request was merged into
+        """
+        if self._collecting is not None:
+            future, batch_ids = self._collecting
+            if batch_ids is not None:
+                if client_ids is None:
+                    self._collecting = (future, None)
+                else:
+                    batch_ids.update(client_ids)
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._collecting = (future, None if client_ids is None else set(client_ids))
+        try:
+            await asyncio.sleep(self.window_seconds)
+            _, batch_ids = self._collecting
+            self._collecting = None
+
+            from app.database import async_session_maker
+
+            async with async_session_maker() as session:
+                result = await MassNotificationService(
+                    session
+                ).send_mass_outage_notification(
+                    None if batch_ids is None else list(batch_ids)
+                )
+                await session.commit()
+        except BaseException as e:
+            if self._collecting is not None and self._collecting[0] is future:
+                self._collecting = None
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Mark retrieved so no warning is logged when nobody merged in
+                future.exception()
+            raise
+
+        future.set_result(result)
+        return result
+
+
+# Global dispatcher instance
+_dispatcher: Optional[MassNotificationDispatcher] = None
+
+
+def get_mass_notification_dispatcher() -> MassNotificationDispatcher:
+    """Get global mass notification dispatcher"""
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = MassNotificationDispatcher()
+    return _dispatcher
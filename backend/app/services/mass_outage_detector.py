@@ -1,15 +1,28 @@
 import logging
 from datetime import datetime, timedelta
 from difflib import SequenceMatcher
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from sqlalchemy import and_, func, select
+from sqlalchemy.exc import ProgrammingError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.database import Classification, Message, MessageType, ScenarioType
 
 logger = logging.getLogger(__name__)
 
+# Optional C++ similarity kernel; difflib is used when it is not installed
+try:
+    from rapidfuzz import process as fuzz_process
+    from rapidfuzz.distance import Indel
+
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+
+# Whether pg_trgm similarity() works on this database; None until first tried
+_trigram_available: Optional[bool] = None
+
 
 class MassOutageDetector:
     """Detect mass platform outages by analyzing similar messages"""
@@ -22,6 +35,8 @@ class MassOutageDetector:
 
     def _calculate_similarity(self, text1: str, text2: str) -> float:
         """Calculate similarity between two texts (0-1)"""
+        if RAPIDFUZZ_AVAILABLE:
+            return Indel.normalized_similarity(text1.lower(), text2.lower())
         return SequenceMatcher(None, text1.lower(), text2.lower()).ratio()
 
     async def detect_mass_outage(
@@ -44,9 +59,84 @@ class MassOutageDetector:
         """
         cutoff_time = datetime.utcnow() - timedelta(minutes=self.time_window_minutes)
 
-        # Get recent messages from different clients
+        counted = await self._count_similar_in_db(
+            current_message, current_client_id, cutoff_time
+        )
+        if counted is None:
+            counted = await self._count_similar_in_process(
+                current_message, current_client_id, cutoff_time
+            )
+        similar_count, avg_similarity = counted
+
+        is_mass_outage = similar_count >= self.mass_threshold
+
+        if is_mass_outage:
+            logger.warning(
+                f"🚨 MASS_OUTAGE detected! {similar_count} similar messages in last "
+                f"{self.time_window_minutes} minutes (avg similarity: {avg_similarity:.2f})"
+            )
+
+        return {
+            "is_mass_outage": is_mass_outage,
+            "similar_messages_count": similar_count,
+            "similarity_score": avg_similarity,
+            "detected_at": datetime.utcnow(),
+        }
+
+    async def _count_similar_in_db(
+        self, current_message: str, current_client_id: str, cutoff_time: datetime
+    ) -> Optional[Tuple[int, float]]:
+        """
+        Count similar recent messages with pg_trgm inside Postgres
+
+        Returns:
+            (similar_count, avg_similarity), or None when trigram similarity is
+            unavailable (not Postgres, or the pg_trgm extension is missing)
+        """
+        global _trigram_available
+        if _trigram_available is False:
+            return None
+        if self.session.get_bind().dialect.name != "postgresql":
+            return None
+
+        similarity = func.similarity(Message.content, current_message)
+        query = select(func.count(), func.coalesce(func.avg(similarity), 0.0)).where(
+            Message.created_at >= cutoff_time,
+            Message.message_type == MessageType.USER,
+            Message.client_id != current_client_id,
+            # Index-assisted match at pg_trgm's default 0.3 limit,
+            # then the detector's own threshold
+            Message.content.op("%")(current_message),
+            similarity >= self.similarity_threshold,
+        )
+        if _trigram_available:
+            result = await self.session.execute(query)
+            similar_count, avg_similarity = result.one()
+            return similar_count, float(avg_similarity)
+
+        try:
+            # Savepoint only for the first probe, so a missing extension does
+            # not abort the caller's transaction
+            async with self.session.begin_nested():
+                result = await self.session.execute(query)
+                similar_count, avg_similarity = result.one()
+        except ProgrammingError as e:
+            _trigram_available = False
+            logger.warning(
+                f"⚠️ pg_trgm unavailable, falling back to in-process similarity: {e}"
+            )
+            return None
+
+        _trigram_available = True
+        return similar_count, float(avg_similarity)
+
+    async def _count_similar_in_process(
+        self, current_message: str, current_client_id: str, cutoff_time: datetime
+    ) -> Tuple[int, float]:
+        """Count similar messages among the last 100 recent messages"""
+        # Get recent messages from different clients (only the text is compared)
         result = await self.session.execute(
-            select(Message)
+            select(Message.content)
             .where(
                 and_(
                     Message.created_at >= cutoff_time,
@@ -61,39 +151,46 @@ class MassOutageDetector:
         recent_messages = result.scalars().all()
 
         if len(recent_messages) < self.mass_threshold:
-            return {
-                "is_mass_outage": False,
-                "similar_messages_count": len(recent_messages),
-                "similarity_score": 0.0,
-                "detected_at": datetime.utcnow(),
-            }
-
-        # Find similar messages
+            return len(recent_messages), 0.0
+
+        if RAPIDFUZZ_AVAILABLE:
+            # Indel similarity is the normalized LCS score; score_cutoff lets
+            # rapidfuzz drop dissimilar texts before the full computation
+            matches = fuzz_process.extract(
+                current_message.lower(),
+                [content.lower() for content in recent_messages],
+                scorer=Indel.normalized_similarity,
+                score_cutoff=self.similarity_threshold,
+                limit=None,
+            )
+            similar_count = len(matches)
+            total_similarity = sum(score for _, score, _ in matches)
+            avg_similarity = total_similarity / similar_count if similar_count > 0 else 0.0
+            return similar_count, avg_similarity
+
+        # Find similar messages. real_quick_ratio() and quick_ratio() are cheap
+        # upper bounds on ratio(), so most dissimilar texts never reach the
+        # full comparison. The current message stays seq1 (ratio() is not
+        # symmetric) and is lowercased once
+        matcher = SequenceMatcher(None)
+        matcher.set_seq1(current_message.lower())
         similar_count = 0
         total_similarity = 0.0
 
-        for msg in recent_messages:
-            similarity = self._calculate_similarity(current_message, msg.content)
+        for content in recent_messages:
+            matcher.set_seq2(content.lower())
+            if (
+                matcher.real_quick_ratio() < self.similarity_threshold
+                or matcher.quick_ratio() < self.similarity_threshold
+            ):
+                continue
+            similarity = matcher.ratio()
             if similarity >= self.similarity_threshold:
                 similar_count += 1
                 total_similarity += similarity
 
         avg_similarity = total_similarity / similar_count if similar_count > 0 else 0.0
-
-        is_mass_outage = similar_count >= self.mass_threshold
-
-        if is_mass_outage:
-            logger.warning(
-                f"🚨 MASS_OUTAGE detected! {similar_count} similar messages in last "
-                f"{self.time_window_minutes} minutes (avg similarity: {avg_similarity:.2f})"
-            )
-
-        return {
-            "is_mass_outage": is_mass_outage,
-            "similar_messages_count": similar_count,
-            "similarity_score": avg_similarity,
-            "detected_at": datetime.utcnow(),
-        }
+        return similar_count, avg_similarity
 
     async def get_mass_outage_stats(self) -> Dict[str, any]:
         """Get statistics about potential mass outages"""
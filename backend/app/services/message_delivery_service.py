@@ -5,31 +5,109 @@ Handles delivery of responses via webhooks and WebSocket notifications
 import asyncio
 import logging
 import random
-from typing import Dict, Optional
-
-from fastapi import BackgroundTasks
+import time
+from dataclasses import dataclass
+from typing import Coroutine, Dict, Optional, Set
+from uuid import UUID
 
 from app.config import get_settings
 from app.services.message_processing_service import ProcessedMessage
 from app.services.message_response_service import MessageResponse
+from app.services.webhook_queue import get_webhook_queue
 from app.services.webhook_sender import WebhookSender
 from app.services.websocket_notifier import notify_all_operators
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Strong references to detached delivery tasks; the event loop only keeps
+# weak ones, so an unreferenced task could be garbage collected mid-flight
+_background: Set[asyncio.Task] = set()
+
+
+# Bounds webhook sends from detached tasks and deliver_sync, so a spike
+# cannot open an unbounded number of requests to the platform at once
+_webhook_semaphore = asyncio.Semaphore(settings.webhook_max_concurrency)
+
+# Monotonic time each client's latest "typing..." delay ends
+_typing_deadlines: Dict[str, float] = {}
+_TYPING_GAP_SECONDS = 0.5
+# Settings do not change at runtime; read once instead of on every response
+_RESPONSE_DELAY_SECONDS = (
+    settings.response_delay_seconds if settings.delays_enabled else 0.0
+)
+
+
+def _typing_delay(client_id: str) -> float:
+    """
+    Seconds to wait before sending a response (simulates "typing...")
+
+    Responses to a burst from one client are spaced at least
+    _TYPING_GAP_SECONDS apart after the previous one instead of each
+    sleeping independently, so they arrive in order.
+    """
+    if _RESPONSE_DELAY_SECONDS <= 0:
+        return 0.0
+    # Add some randomness (±1 second) for more natural feel, minimum 1 second
+    delay = max(1.0, _RESPONSE_DELAY_SECONDS + random.random() * 2 - 1)
+    now = time.monotonic()
+    deadline = max(now + delay, _typing_deadlines.get(client_id, 0.0) + _TYPING_GAP_SECONDS)
+    _typing_deadlines[client_id] = deadline
+    if len(_typing_deadlines) > 10000:
+        # Forget clients whose delays have passed
+        for key in [k for k, v in _typing_deadlines.items() if v < now]:
+            del _typing_deadlines[key]
+    return deadline - now
+
+
+def _spawn(coro: Coroutine) -> asyncio.Task:
+    """Run coro on the event loop, detached from the request lifecycle"""
+    task = asyncio.create_task(coro)
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+    return task
+
+
+async def drain_background_deliveries(timeout: float = 10.0) -> None:
+    """Let detached deliveries finish (up to timeout), then cancel the rest"""
+    if not _background:
+        return
+    tasks = list(_background)
+    _, pending = await asyncio.wait(tasks, timeout=timeout)
+    if pending:
+        logger.warning(
+            "⚠️ Cancelling %d background deliveries still running at shutdown",
+            len(pending),
+        )
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
 
+
+@dataclass(frozen=True, slots=True)
 class DeliveryResult:
     """Result of message delivery"""
-    def __init__(
-        self,
-        webhook_sent: bool = False,
-        webhook_result: Optional[Dict] = None,
-        websocket_notified: bool = False,
-    ):
-        self.webhook_sent = webhook_sent
-        self.webhook_result = webhook_result
-        self.websocket_notified = websocket_notified
+
+    webhook_sent: bool = False
+    webhook_result: Optional[Dict] = None
+    websocket_notified: bool = False
+
+
+@dataclass(frozen=True, slots=True)
+class WebhookPayload:
+    """
+    Everything the delivery tasks need, built once per response
+
+    IDs stay UUIDs; the webhook body is encoded with orjson, which writes
+    them as strings.
+    """
+
+    client_id: str
+    response_text: str
+    message_id: UUID
+    classification: Optional[Dict]
+    requires_escalation: bool
+    escalation_data: Optional[Dict]
 
 
 class MessageDeliveryService:
@@ -57,19 +135,19 @@ class MessageDeliveryService:
         self,
         processed_message: ProcessedMessage,
         message_response: MessageResponse,
-    ) -> Dict:
+    ) -> WebhookPayload:
         """
         Prepare data for webhook delivery
         
         Returns:
-            Dict with webhook payload
+            WebhookPayload shared by the webhook and operator notification
         """
         classification_data = None
         if processed_message.classification:
             classification_data = {
                 "scenario": processed_message.scenario,
                 "confidence": processed_message.confidence,
-                "id": str(processed_message.classification.id),
+                "id": processed_message.classification.id,
                 "reasoning": processed_message.classification.reasoning,
             }
 
@@ -86,56 +164,43 @@ class MessageDeliveryService:
                 "priority_queue": processed_message.priority_queue,
             }
 
-        return {
-            "client_id": processed_message.original_message.client_id,
-            "response_text": message_response.response_text,
-            "message_id": str(message_response.response_message.id),
-            "classification": classification_data,
-            "requires_escalation": processed_message.requires_escalation,
-            "escalation_data": escalation_data,
-            "response_data": {
-                "original_message_id": str(processed_message.original_message.id),
-                "response_message_id": str(message_response.response_message.id),
-                "response_text": message_response.response_text,
-                "response_type": message_response.response_message.message_type.value,
-                "is_first_message": processed_message.is_first_message,
-                "priority": processed_message.priority.value,
-                "escalation_reason": (
-                    processed_message.escalation_reason.value
-                    if processed_message.escalation_reason
-                    else None
-                ),
-            },
-        }
+        return WebhookPayload(
+            client_id=processed_message.original_message.client_id,
+            response_text=message_response.response_text,
+            message_id=message_response.response_message.id,
+            classification=classification_data,
+            requires_escalation=processed_message.requires_escalation,
+            escalation_data=escalation_data,
+        )
 
     async def send_webhook_async(
-        self, webhook_data: Dict
+        self, payload: WebhookPayload, delay: Optional[float] = None
     ) -> Dict:
         """
         Send webhook asynchronously (for background tasks)
-        
+
+        Args:
+            delay: Seconds to wait first; the client's typing delay if None
+
         Returns:
             Webhook result dict
         """
         try:
-            # Add delay before sending response (simulate "typing...")
-            if settings.delays_enabled and settings.response_delay_seconds > 0:
-                delay = settings.response_delay_seconds
-                # Add some randomness (±1 second) for more natural feel
-                delay += random.uniform(-1.0, 1.0)
-                delay = max(1.0, delay)  # Minimum 1 second
-                logger.debug(
-                    f"⏳ Delaying response by {delay:.1f} seconds for better UX"
-                )
+            if delay is None:
+                delay = _typing_delay(payload.client_id)
+            if delay > 0:
+                logger.debug("⏳ Delaying response by %.1f seconds for better UX", delay)
                 await asyncio.sleep(delay)
 
-            webhook_result = await self.webhook_sender.send_response(
-                client_id=webhook_data["client_id"],
-                response_text=webhook_data["response_text"],
-                message_id=webhook_data["message_id"],
-                classification=webhook_data.get("classification"),
-            )
-            logger.info(f"📤 Webhook send result: {webhook_result}")
+            # Acquired after the typing delay, so sleeping sends hold no slot
+            async with _webhook_semaphore:
+                webhook_result = await self.webhook_sender.send_response(
+                    client_id=payload.client_id,
+                    response_text=payload.response_text,
+                    message_id=payload.message_id,
+                    classification=payload.classification,
+                )
+            logger.info("📤 Webhook send result: %s", webhook_result)
             return webhook_result
         except Exception as webhook_error:
             logger.error(
@@ -148,24 +213,26 @@ class MessageDeliveryService:
             }
 
     async def notify_operators_async(
-        self, webhook_data: Dict
+        self, payload: WebhookPayload
     ) -> None:
         """
         Notify operators via WebSocket asynchronously
         """
-        if not webhook_data.get("requires_escalation"):
+        if not payload.requires_escalation:
             return
 
         try:
-            escalation_data = webhook_data.get("escalation_data")
+            escalation_data = payload.escalation_data
             if escalation_data:
                 await notify_all_operators(
                     {
                         "type": "escalation",
-                        "client_id": webhook_data["client_id"],
-                        "message": f"New escalation from {webhook_data['client_id']}",
-                        "scenario": webhook_data.get("classification", {}).get(
-                            "scenario", "UNKNOWN"
+                        "client_id": payload.client_id,
+                        "message": f"New escalation from {payload.client_id}",
+                        "scenario": (
+                            payload.classification["scenario"]
+                            if payload.classification
+                            else "UNKNOWN"
                         ),
                         "priority": escalation_data.get("priority", "low"),
                         "priority_queue": escalation_data.get("priority_queue", 10),
@@ -184,43 +251,51 @@ class MessageDeliveryService:
 
     def schedule_delivery(
         self,
-        background_tasks: BackgroundTasks,
         processed_message: ProcessedMessage,
         message_response: MessageResponse,
     ) -> DeliveryResult:
         """
-        Schedule delivery of message via background tasks
-        
-        This method schedules webhook and WebSocket delivery in background,
-        allowing the API to return immediately without blocking.
-        
+        Schedule delivery of message outside the request lifecycle
+
+        The webhook goes through the background webhook queue (or a detached
+        task when the queue is not running) and the WebSocket notification
+        runs as a detached task, so both proceed concurrently: Starlette runs
+        BackgroundTasks one after another once the response is sent and may
+        cancel them when the client disconnects. Detached tasks are drained
+        on shutdown by drain_background_deliveries. Failures are logged, not
+        raised.
+
         Returns:
             DeliveryResult with scheduling information
         """
-        webhook_data = self.prepare_webhook_data(
+        payload = self.prepare_webhook_data(
             processed_message, message_response
         )
 
-        # Schedule webhook delivery in background
-        background_tasks.add_task(
-            self.send_webhook_async,
-            webhook_data,
-        )
+        # The webhook waits out the typing delay in the queue's timer heap
+        # rather than in a sleeping task of its own
+        delay = _typing_delay(payload.client_id)
+        if not get_webhook_queue().enqueue(
+            self.webhook_sender,
+            payload.client_id,
+            payload.response_text,
+            payload.message_id,
+            payload.classification,
+            delay=delay,
+        ):
+            _spawn(self.send_webhook_async(payload, delay))
 
-        # Schedule WebSocket notification in background
-        background_tasks.add_task(
-            self.notify_operators_async,
-            webhook_data,
-        )
+        # Operators are only told about escalations, so most messages need
+        # no WebSocket task
+        if payload.requires_escalation:
+            _spawn(self.notify_operators_async(payload))
 
-        logger.info(
-            f"📤 Scheduled delivery for client {processed_message.original_message.client_id}"
-        )
+        logger.info("📤 Scheduled delivery for client %s", payload.client_id)
 
         return DeliveryResult(
             webhook_sent=True,
             webhook_result={"success": True, "scheduled": True},
-            websocket_notified=True,
+            websocket_notified=payload.requires_escalation,
         )
 
     async def deliver_sync(
@@ -234,19 +309,23 @@ class MessageDeliveryService:
         Returns:
             DeliveryResult with delivery status
         """
-        webhook_data = self.prepare_webhook_data(
+        payload = self.prepare_webhook_data(
             processed_message, message_response
         )
 
-        # Send webhook synchronously
-        webhook_result = await self.send_webhook_async(webhook_data)
-
-        # Notify operators synchronously
-        await self.notify_operators_async(webhook_data)
+        # Send webhook and notify operators (escalations only) concurrently;
+        # both coroutines catch and log their own errors
+        if payload.requires_escalation:
+            webhook_result, _ = await asyncio.gather(
+                self.send_webhook_async(payload),
+                self.notify_operators_async(payload),
+            )
+        else:
+            webhook_result = await self.send_webhook_async(payload)
 
         return DeliveryResult(
             webhook_sent=True,
             webhook_result=webhook_result,
-            websocket_notified=True,
+            websocket_notified=payload.requires_escalation,
         )
 
@@ -3,11 +3,13 @@ Message Processing Service
 Handles the core logic of processing incoming messages
 """
 import logging
+import re
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Dict, Optional
-from uuid import uuid4
+from uuid import UUID, uuid4
 
-from sqlalchemy import func, select
+from sqlalchemy import exists, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.database import (
@@ -17,41 +19,57 @@ from app.models.database import (
     MessageType,
     PriorityLevel,
     ScenarioType,
+    content_fingerprint,
 )
-from app.services.ai_classifier import AIClassifier
+from app.services.ai_classifier import ClassificationResult, get_classifier
 from app.services.dialog_auto_close import DialogAutoCloseService
 from app.services.escalation_manager import EscalationManager
 from app.services.mass_outage_detector import MassOutageDetector
-from app.services.text_processor import TextProcessor
+from app.services.text_processor import get_text_processor
 
 logger = logging.getLogger(__name__)
 
+# Value -> member maps for the escalation result; .get() avoids raising and
+# catching ValueError for values the enums do not define
+_PRIORITY_BY_VALUE = {member.value: member for member in PriorityLevel}
+_REASON_BY_VALUE = {member.value: member for member in EscalationReason}
+
+# Scenarios that always go to an operator
+_ESCALATION_SCENARIOS = frozenset(
+    {
+        "SCHEDULE_CHANGE",
+        "COMPLAINT",
+        "MISSING_TRAINER",
+        "CROSS_EXTENSION",
+        "UNKNOWN",
+    }
+)
+_DIGIT_RE = re.compile(r"\d")
+
 
+@dataclass(frozen=True, slots=True)
 class ProcessedMessage:
     """Result of message processing"""
-    def __init__(
-        self,
-        original_message: Message,
-        classification: Optional[Classification],
-        scenario: str,
-        confidence: float,
-        requires_escalation: bool,
-        priority: PriorityLevel,
-        escalation_reason: Optional[EscalationReason],
-        is_first_message: bool,
-        processed_text: str,
-        priority_queue: int = 10,
-    ):
-        self.original_message = original_message
-        self.classification = classification
-        self.scenario = scenario
-        self.confidence = confidence
-        self.requires_escalation = requires_escalation
-        self.priority = priority
-        self.escalation_reason = escalation_reason
-        self.is_first_message = is_first_message
-        self.processed_text = processed_text
-        self.priority_queue = priority_queue
+
+    original_message: Message
+    classification: Optional[Classification]
+    scenario: str
+    confidence: float
+    requires_escalation: bool
+    priority: PriorityLevel
+    escalation_reason: Optional[EscalationReason]
+    is_first_message: bool
+    processed_text: str
+    priority_queue: int = 10
+
+
+@dataclass(frozen=True, slots=True)
+class PreflightResult:
+    """Checks run before a message is saved"""
+
+    duplicate_id: Optional[UUID]
+    is_first_message: bool
+    recent_count: int
 
 
 class MessageProcessingService:
@@ -59,33 +77,80 @@ class MessageProcessingService:
 
     def __init__(self, session: AsyncSession):
         self.session = session
-        self.text_processor = TextProcessor()
-        self.ai_classifier = AIClassifier()
+        self.text_processor = get_text_processor()
+        self.ai_classifier = get_classifier()
         self.dialog_service = DialogAutoCloseService(session)
+        self.mass_outage_detector = MassOutageDetector(session)
+        self.escalation_manager = EscalationManager(session)
+
+    async def preflight(
+        self,
+        client_id: str,
+        content: str,
+        rate_limit: Optional[int] = None,
+        time_window_seconds: int = 5,
+    ) -> PreflightResult:
+        """
+        Run the duplicate, first-message and rate-limit checks in one query
+
+        Args:
+            rate_limit: Messages per minute allowed; recent messages are only
+                counted up to this many, None skips the count
+
+        Returns:
+            PreflightResult (recent_count is 0 when rate_limit is None)
+        """
+        now = datetime.utcnow()
+        client_messages = select(Message.id).where(Message.client_id == client_id)
+
+        duplicate_id = (
+            client_messages.where(
+                Message.content_hash == content_fingerprint(content),
+                Message.created_at >= now - timedelta(seconds=time_window_seconds),
+            )
+            .order_by(Message.created_at.desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+        columns = [duplicate_id, client_messages.exists()]
+        if rate_limit is not None:
+            # Stop counting once the limit is reached
+            recent = (
+                client_messages.where(Message.created_at >= now - timedelta(minutes=1))
+                .limit(rate_limit)
+                .subquery()
+            )
+            columns.append(select(func.count()).select_from(recent).scalar_subquery())
+
+        row = (await self.session.execute(select(*columns))).one()
+        return PreflightResult(
+            duplicate_id=row[0],
+            is_first_message=not row[1],
+            recent_count=row[2] if rate_limit is not None else 0,
+        )
 
     async def check_duplicate(
         self, client_id: str, content: str, time_window_seconds: int = 5
-    ) -> Optional[Message]:
+    ) -> bool:
         """
         Check for duplicate messages
         
         Returns:
-            Duplicate message if found, None otherwise
+            True if the client sent the same text within the time window
         """
         cutoff_time = datetime.utcnow() - timedelta(seconds=time_window_seconds)
         
         result = await self.session.execute(
-            select(Message)
-            .where(
-                Message.client_id == client_id,
-                Message.content == content,
-                Message.created_at >= cutoff_time,
+            select(
+                exists().where(
+                    Message.client_id == client_id,
+                    Message.content_hash == content_fingerprint(content),
+                    Message.created_at >= cutoff_time,
+                )
             )
-            .order_by(Message.created_at.desc())
-            .limit(1)
         )
         
-        return result.scalar_one_or_none()
+        return result.scalar()
 
     async def check_rate_limit(
         self, client_id: str, limit_per_minute: int
@@ -96,28 +161,30 @@ class MessageProcessingService:
         Returns:
             True if within limit, False if exceeded
         """
+        if limit_per_minute <= 0:
+            return False
         one_minute_ago = datetime.utcnow() - timedelta(minutes=1)
+        # Probe for the (limit)-th recent message instead of counting them all
         result = await self.session.execute(
-            select(func.count(Message.id)).where(
+            select(Message.id)
+            .where(
                 Message.client_id == client_id,
                 Message.created_at >= one_minute_ago,
             )
+            .offset(limit_per_minute - 1)
+            .limit(1)
         )
-        count = result.scalar_one()
-        return count < limit_per_minute
+        return result.first() is None
 
     async def determine_first_message(self, client_id: str) -> bool:
         """
         Determine if this is the first message from client
-        Uses SELECT FOR UPDATE to prevent race conditions
+        Reads at most one row; the client's history is not fetched or locked
         """
         result = await self.session.execute(
-            select(Message)
-            .where(Message.client_id == client_id)
-            .with_for_update()  # Wait for locks, don't skip
+            select(Message.id).where(Message.client_id == client_id).limit(1)
         )
-        existing_messages = result.scalars().all()
-        return len(existing_messages) == 0
+        return result.first() is None
 
     async def save_original_message(
         self, 
@@ -138,9 +205,9 @@ class MessageProcessingService:
             is_first_message=is_first_message,
         )
         self.session.add(message)
-        await self.session.flush()
-        
-        # Update dialog activity and save webhook info
+
+        # Update dialog activity and save webhook info; its flush also
+        # inserts the message
         await self.dialog_service.update_activity(
             client_id,
             webhook_url=webhook_url,
@@ -149,8 +216,9 @@ class MessageProcessingService:
         )
         
         logger.debug(
-            f"✅ Saved original message: {message.id} "
-            f"(first_message={is_first_message})"
+            "✅ Saved original message: %s (first_message=%s)",
+            message.id,
+            is_first_message,
         )
         return message
 
@@ -168,16 +236,15 @@ class MessageProcessingService:
 
     async def classify_message(
         self, processed_text: str, client_id: str
-    ) -> Dict:
+    ) -> ClassificationResult:
         """
         Classify message using AI or mass outage detection
         
         Returns:
-            Classification result dict
+            ClassificationResult
         """
         # Check for mass outage first
-        mass_outage_detector = MassOutageDetector(self.session)
-        mass_outage_result = await mass_outage_detector.detect_mass_outage(
+        mass_outage_result = await self.mass_outage_detector.detect_mass_outage(
             current_message=processed_text,
             current_client_id=client_id,
         )
@@ -187,13 +254,15 @@ class MessageProcessingService:
                 f"🚨 Mass outage detected! Overriding classification to MASS_OUTAGE. "
                 f"Similar messages: {mass_outage_result.get('similar_messages_count')}"
             )
-            return {
-                "success": True,
-                "scenario": "MASS_OUTAGE",
-                "confidence": 0.95,
-                "reasoning": f"Mass outage detected: {mass_outage_result.get('similar_messages_count')} similar messages",
-                "model": "mass_outage_detector",
-            }
+            return ClassificationResult(
+                scenario="MASS_OUTAGE",
+                confidence=0.95,
+                reasoning=f"Mass outage detected: {mass_outage_result.get('similar_messages_count')} similar messages",
+                success=True,
+                error=None,
+                model="mass_outage_detector",
+                client_id=client_id,
+            )
 
         # Normal AI classification
         return await self.ai_classifier.classify(
@@ -219,7 +288,7 @@ class MessageProcessingService:
         )
         self.session.add(classification)
         await self.session.flush()
-        logger.debug(f"✅ Saved classification: {classification.id}")
+        logger.debug("✅ Saved classification: %s", classification.id)
         return classification
 
     async def evaluate_escalation(
@@ -236,23 +305,13 @@ class MessageProcessingService:
         Returns:
             Escalation result dict with should_escalate, level, reasons, etc.
         """
-        escalation_manager = EscalationManager(self.session)
-        escalation_result = await escalation_manager.evaluate_escalation(
+        escalation_result = await self.escalation_manager.evaluate_escalation(
             message_id=message_id,
             scenario=scenario,
             confidence=confidence,
             client_id=client_id,
         )
 
-        # Check scenario-specific escalation rules
-        escalation_scenarios = [
-            "SCHEDULE_CHANGE",
-            "COMPLAINT",
-            "MISSING_TRAINER",
-            "CROSS_EXTENSION",
-            "UNKNOWN",
-        ]
-        
         # Check if message contains media (photo/document) - requires escalation per TZ
         has_media = (
             "[ФОТО получено" in content
@@ -262,26 +321,23 @@ class MessageProcessingService:
         
         # Escalate if media received (especially for REVIEW_BONUS and ABSENCE_REQUEST)
         if has_media:
-            logger.info(f"Media file detected in message, escalating to operator")
+            logger.info("Media file detected in message, escalating to operator")
             # Force escalation for media messages
             escalation_result["should_escalate"] = True
             escalation_result["level"] = "high"
             escalation_result["reasons"] = escalation_result.get("reasons", []) + ["media_received"]
         
+        # Check scenario-specific escalation rules
         requires_escalation = (
-            scenario in escalation_scenarios
-            or (
-                scenario == "REFERRAL"
-                and any(char.isdigit() for char in content)
-            )
+            scenario in _ESCALATION_SCENARIOS
+            or (scenario == "REFERRAL" and _DIGIT_RE.search(content) is not None)
             or escalation_result.get("should_escalate", False)
         )
 
         # Set priority and escalation reason
         priority_level_str = escalation_result.get("level", "low")
-        try:
-            priority_level = PriorityLevel(priority_level_str)
-        except ValueError:
+        priority_level = _PRIORITY_BY_VALUE.get(priority_level_str)
+        if priority_level is None:
             logger.warning(
                 f"Invalid priority level '{priority_level_str}', defaulting to 'low'"
             )
@@ -289,14 +345,10 @@ class MessageProcessingService:
 
         escalation_reason = None
         reasons = escalation_result.get("reasons")
-        if reasons and isinstance(reasons, list) and len(reasons) > 0:
-            try:
-                escalation_reason = EscalationReason(reasons[0])
-            except (ValueError, IndexError):
-                logger.warning(
-                    f"Invalid escalation reason '{reasons[0] if reasons else None}'"
-                )
-                escalation_reason = None
+        if reasons and isinstance(reasons, list):
+            escalation_reason = _REASON_BY_VALUE.get(reasons[0])
+            if escalation_reason is None:
+                logger.warning(f"Invalid escalation reason '{reasons[0]}'")
 
         priority_queue = escalation_result.get("priority_queue", 10)
         
@@ -315,6 +367,7 @@ class MessageProcessingService:
         webhook_url: Optional[str] = None,
         platform: Optional[str] = None,
         chat_id: Optional[str] = None,
+        is_first_message: Optional[bool] = None,
     ) -> ProcessedMessage:
         """
         Main method to process a message
@@ -323,18 +376,19 @@ class MessageProcessingService:
             client_id: Client ID
             content: Message content
             skip_duplicate_check: If True, skip duplicate check (already done in endpoint)
+            is_first_message: First-message flag from preflight(), looked up if None
         
         Returns:
             ProcessedMessage object with all processing results
         """
         # Check for duplicate (can be skipped if already checked in endpoint)
         if not skip_duplicate_check:
-            duplicate = await self.check_duplicate(client_id, content)
-            if duplicate:
+            if await self.check_duplicate(client_id, content):
                 raise ValueError("DUPLICATE_MESSAGE")
 
-        # Determine if first message
-        is_first_message = await self.determine_first_message(client_id)
+        # Determine if first message (unless preflight already did)
+        if is_first_message is None:
+            is_first_message = await self.determine_first_message(client_id)
 
         # Save original message
         original_message = await self.save_original_message(
@@ -363,9 +417,9 @@ class MessageProcessingService:
             processed_text, client_id
         )
 
-        if not classification_result.get("success"):
+        if not classification_result.success:
             logger.error(
-                f"❌ Classification failed: {classification_result.get('error')}"
+                f"❌ Classification failed: {classification_result.error}"
             )
             return ProcessedMessage(
                 original_message=original_message,
@@ -380,16 +434,16 @@ class MessageProcessingService:
                 priority_queue=10,
             )
 
-        scenario = classification_result.get("scenario")
-        confidence = classification_result.get("confidence")
+        scenario = classification_result.scenario
+        confidence = classification_result.confidence
 
         # Save classification
         classification = await self.save_classification(
             original_message,
             scenario,
             confidence,
-            classification_result.get("model", "openai_4o_mini"),
-            classification_result.get("reasoning"),
+            classification_result.model,
+            classification_result.reasoning,
         )
 
         # Evaluate escalation
@@ -401,10 +455,10 @@ class MessageProcessingService:
             content,
         )
 
-        # Update message with priority and escalation reason
+        # Update message with priority and escalation reason. Left pending:
+        # the response the caller creates next is flushed in the same batch
         original_message.priority = escalation_info["priority"]
         original_message.escalation_reason = escalation_info["escalation_reason"]
-        await self.session.flush()
 
         return ProcessedMessage(
             original_message=original_message,
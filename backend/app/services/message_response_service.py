@@ -3,6 +3,7 @@ Message Response Service
 Handles creation of bot responses based on processed messages
 """
 import logging
+from dataclasses import dataclass
 from typing import Dict, Optional, Tuple
 
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -15,17 +16,29 @@ from app.services.response_manager import ResponseManager
 logger = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True, slots=True)
 class MessageResponse:
     """Result of response creation"""
-    def __init__(
-        self,
-        response_message: Message,
-        response_text: str,
-        scenario_response_message: Optional[Message] = None,
-    ):
-        self.response_message = response_message
-        self.response_text = response_text
-        self.scenario_response_message = scenario_response_message
+
+    response_message: Message
+    response_text: str
+    scenario_response_message: Optional[Message] = None
+
+
+def _combine_greeting(
+    greeting_text: str, response_msg: Optional[Message], response_text: str
+) -> Tuple[Optional[Message], str]:
+    """
+    Put the first-message greeting in front of a response
+
+    The response message is updated in place; a failed response (no
+    message) is returned unchanged so the caller falls back as usual.
+    """
+    if response_msg is None:
+        return response_msg, response_text
+    combined_text = f"{greeting_text}\n\n{response_text}"
+    response_msg.content = combined_text
+    return response_msg, combined_text
 
 
 class MessageResponseService:
@@ -54,12 +67,8 @@ class MessageResponseService:
         greeting_msg = None
         if is_first_message and scenario != "GREETING":
             # Send automatic greeting for first-time clients
-            greeting_msg, greeting_text = await self.response_manager.create_bot_response(
-                scenario="GREETING",
-                client_id=client_id,
-                original_message_id=str(processed_message.original_message.id),
-                params={},
-                message_type=MessageType.BOT_AUTO,
+            greeting_msg, greeting_text = await self._create_greeting(
+                processed_message, client_id
             )
             if greeting_msg:
                 logger.info(f"✅ Sent automatic greeting for first-time client {client_id}")
@@ -82,19 +91,14 @@ class MessageResponseService:
                 
                 # If first message, combine greeting with tech support response
                 if is_first_message and not greeting_msg:
-                    greeting_msg, greeting_text = await self.response_manager.create_bot_response(
-                        scenario="GREETING",
-                        client_id=client_id,
-                        original_message_id=str(processed_message.original_message.id),
-                        params={},
-                        message_type=MessageType.BOT_AUTO,
+                    greeting_msg, greeting_text = await self._create_greeting(
+                        processed_message, client_id
                     )
                 
                 if is_first_message and greeting_msg:
-                    # Combine greeting with tech support response
-                    combined_text = f"{greeting_text}\n\n{response_text}"
-                    response_msg.content = combined_text
-                    response_text = combined_text
+                    response_msg, response_text = _combine_greeting(
+                        greeting_text, response_msg, response_text
+                    )
                     logger.info(f"✅ Combined greeting with TECH_SUPPORT_BASIC response for first-time client")
                 
                 logger.info(f"📤 Created TECH_SUPPORT_BASIC response (with screenshot request) for client {client_id}")
@@ -110,19 +114,14 @@ class MessageResponseService:
                 
                 # If first message, combine greeting with escalation message
                 if is_first_message and not greeting_msg:
-                    greeting_msg, greeting_text = await self.response_manager.create_bot_response(
-                        scenario="GREETING",
-                        client_id=client_id,
-                        original_message_id=str(processed_message.original_message.id),
-                        params={},
-                        message_type=MessageType.BOT_AUTO,
+                    greeting_msg, greeting_text = await self._create_greeting(
+                        processed_message, client_id
                     )
                 
                 if is_first_message and greeting_msg:
-                    # Combine greeting with escalation message
-                    combined_text = f"{greeting_msg.content}\n\n{response_text}"
-                    response_msg.content = combined_text
-                    response_text = combined_text
+                    response_msg, response_text = _combine_greeting(
+                        greeting_text, response_msg, response_text
+                    )
                     logger.info(f"✅ Combined greeting with escalation response for first-time client")
 
                 # Note: scenario_msg is created for operator context only (stored in DB)
@@ -160,11 +159,9 @@ class MessageResponseService:
             
             # If this is first message and scenario is not GREETING, combine greeting with response
             if is_first_message and greeting_msg and scenario != "GREETING":
-                # Combine greeting text with scenario response text
-                combined_text = f"{greeting_msg.content}\n\n{response_text}"
-                # Update response message content
-                response_msg.content = combined_text
-                response_text = combined_text
+                response_msg, response_text = _combine_greeting(
+                    greeting_text, response_msg, response_text
+                )
                 logger.info(f"✅ Combined greeting with {scenario} response for first-time client")
 
         if not response_msg:
@@ -184,6 +181,18 @@ class MessageResponseService:
             scenario_response_message=scenario_msg if requires_escalation else None,
         )
 
+    async def _create_greeting(
+        self, processed_message: ProcessedMessage, client_id: str
+    ) -> Tuple[Optional[Message], Optional[str]]:
+        """Create the automatic greeting sent with a client's first message"""
+        return await self.response_manager.create_bot_response(
+            scenario="GREETING",
+            client_id=client_id,
+            original_message_id=str(processed_message.original_message.id),
+            params={},
+            message_type=MessageType.BOT_AUTO,
+        )
+
     async def create_reminders(
         self,
         client_id: str,
@@ -203,23 +212,15 @@ class MessageResponseService:
             logger.debug(f"Skipping reminders for scenario {scenario}")
             return
 
-        await self.reminder_service.create_reminder(
-            client_id=client_id,
-            message_id=message_id,
-            reminder_type=ReminderType.REMINDER_15MIN,
-        )
-
-        await self.reminder_service.create_reminder(
-            client_id=client_id,
-            message_id=message_id,
-            reminder_type=ReminderType.REMINDER_30MIN,
-        )
-        
-        # Add reminder for next day (per TZ requirement)
-        await self.reminder_service.create_reminder(
+        # 1day reminder is the next-day follow-up required by the TZ
+        await self.reminder_service.create_reminders(
             client_id=client_id,
             message_id=message_id,
-            reminder_type=ReminderType.REMINDER_1DAY,
+            reminder_types=[
+                ReminderType.REMINDER_15MIN,
+                ReminderType.REMINDER_30MIN,
+                ReminderType.REMINDER_1DAY,
+            ],
         )
 
         logger.debug(f"Created reminders (15min, 30min, 1day) for message {message_id}")
@@ -255,6 +256,9 @@ class MessageResponseService:
         # Mark original as processed
         processed_message.original_message.is_processed = True
 
+        # These two run one after the other on purpose: an AsyncSession cannot
+        # execute statements concurrently, and a second connection would not
+        # see the uncommitted message that cancel_pending_reminders locks
         # Create reminders if needed
         await self.create_reminders(
             client_id=processed_message.original_message.client_id,
@@ -36,17 +36,7 @@ class ReminderService:
         Returns:
             Created Reminder object
         """
-        # Calculate scheduled_at based on reminder_type
-        if delay_minutes is not None:
-            scheduled_at = datetime.utcnow() + timedelta(minutes=delay_minutes)
-        elif reminder_type == ReminderType.REMINDER_15MIN:
-            scheduled_at = datetime.utcnow() + timedelta(minutes=15)
-        elif reminder_type == ReminderType.REMINDER_30MIN:
-            scheduled_at = datetime.utcnow() + timedelta(minutes=30)
-        elif reminder_type == ReminderType.REMINDER_1DAY:
-            scheduled_at = datetime.utcnow() + timedelta(days=1)
-        else:
-            scheduled_at = datetime.utcnow() + timedelta(minutes=30)  # Default
+        scheduled_at = self._scheduled_at(reminder_type, datetime.utcnow(), delay_minutes)
 
         reminder = Reminder(
             id=uuid.uuid4(),
@@ -67,6 +57,67 @@ class ReminderService:
 
         return reminder
 
+    async def create_reminders(
+        self,
+        client_id: str,
+        message_id: str,
+        reminder_types: List[ReminderType],
+    ) -> List[Reminder]:
+        """
+        Create several reminders for a client message in a single flush
+
+        Args:
+            client_id: Client ID
+            message_id: ID of the message to remind about
+            reminder_types: Types of reminders to create
+
+        Returns:
+            Created Reminder objects, in the order of reminder_types
+        """
+        now = datetime.utcnow()
+        message_uuid = uuid.UUID(message_id)
+        reminders = [
+            Reminder(
+                id=uuid.uuid4(),
+                client_id=client_id,
+                message_id=message_uuid,
+                reminder_type=reminder_type,
+                scheduled_at=self._scheduled_at(reminder_type, now),
+                is_cancelled=False,
+            )
+            for reminder_type in reminder_types
+        ]
+
+        # One flush sends all rows as a single executemany INSERT
+        self.session.add_all(reminders)
+        await self.session.flush()
+
+        logger.info(
+            "Created %d reminders for client %s, types=%s",
+            len(reminders),
+            client_id,
+            ",".join(reminder_type.value for reminder_type in reminder_types),
+        )
+
+        return reminders
+
+    @staticmethod
+    def _scheduled_at(
+        reminder_type: ReminderType,
+        now: datetime,
+        delay_minutes: Optional[int] = None,
+    ) -> datetime:
+        """Calculate when a reminder is due based on its type"""
+        if delay_minutes is not None:
+            return now + timedelta(minutes=delay_minutes)
+        if reminder_type == ReminderType.REMINDER_15MIN:
+            return now + timedelta(minutes=15)
+        if reminder_type == ReminderType.REMINDER_30MIN:
+            return now + timedelta(minutes=30)
+        if reminder_type == ReminderType.REMINDER_1DAY:
+            return now + timedelta(days=1)
+        return now + timedelta(minutes=30)  # Default
+
     async def get_pending_reminders(self, limit: int = 100) -> List[Reminder]:
         """
         Get reminders that are due to be sent.
@@ -1,6 +1,7 @@
 import logging
 import uuid
-from typing import Dict, Optional, Tuple
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -12,6 +13,34 @@ from app.utils.prompts import RESPONSE_TEMPLATES
 logger = logging.getLogger(__name__)
 
 
+# Active templates change only through the admin API; other workers pick up
+# an edit once their cached copy expires
+_TEMPLATE_CACHE_TTL_SECONDS = 60
+
+
+@dataclass(frozen=True, slots=True)
+class _TemplateSnapshot:
+    """Read-only copy of a response template, safe to share across sessions"""
+
+    template_text: str
+    requires_params: Dict
+    version: int = 1
+    is_active: bool = True
+    scenario_name: Optional[ScenarioType] = None
+
+
+# Built once at import instead of defining a class and instance per lookup
+_FALLBACK_TEMPLATES = {
+    name: _TemplateSnapshot(data["text"], data.get("requires_params", {}))
+    for name, data in RESPONSE_TEMPLATES.items()
+}
+
+
+def template_cache_key(scenario: str) -> str:
+    """Cache key of the active template for a scenario"""
+    return f"response_template:{scenario}"
+
+
 class ResponseManager:
     """Manage response templates and selection"""
 
@@ -79,22 +108,15 @@ class ResponseManager:
         """
         try:
             # Handle ESCALATED scenario - use template from RESPONSE_TEMPLATES if not in DB
-            if scenario == "ESCALATED":
-                from app.utils.prompts import RESPONSE_TEMPLATES
-
-                if "ESCALATED" in RESPONSE_TEMPLATES:
-                    # Create temporary template object
-                    class TempTemplate:
-                        def __init__(self, text, params):
-                            self.template_text = text
-                            self.requires_params = params
-                            self.version = 1
-                            self.is_active = True
-
-                    template_data = RESPONSE_TEMPLATES["ESCALATED"]
-                    return TempTemplate(
-                        template_data["text"], template_data.get("requires_params", {})
-                    )
+            if scenario == "ESCALATED" and scenario in _FALLBACK_TEMPLATES:
+                return _FALLBACK_TEMPLATES[scenario]
+
+            # Every response needs its template (first messages need two), so
+            # active ones are served from the process cache between requests
+            cache = get_cache()
+            cached = cache.get(template_cache_key(scenario))
+            if cached is not None:
+                return cached
 
             result = await self.session.execute(
                 select(ResponseTemplate)
@@ -110,6 +132,17 @@ class ResponseManager:
                 logger.debug(
                     f"Found template for scenario {scenario}: v{template.version}"
                 )
+                cache.set(
+                    template_cache_key(scenario),
+                    _TemplateSnapshot(
+                        template_text=template.template_text,
+                        requires_params=template.requires_params,
+                        version=template.version,
+                        is_active=template.is_active,
+                        scenario_name=template.scenario_name,
+                    ),
+                    ttl_seconds=_TEMPLATE_CACHE_TTL_SECONDS,
+                )
             else:
                 logger.warning(f"No template found for scenario {scenario}")
 
@@ -118,21 +151,8 @@ class ResponseManager:
         except (KeyError, ValueError) as e:
             # Scenario not in enum - try RESPONSE_TEMPLATES as fallback
             logger.debug(f"Scenario {scenario} not in enum, trying RESPONSE_TEMPLATES")
-            from app.utils.prompts import RESPONSE_TEMPLATES
-
-            if scenario in RESPONSE_TEMPLATES:
-
-                class TempTemplate:
-                    def __init__(self, text, params):
-                        self.template_text = text
-                        self.requires_params = params
-                        self.version = 1
-                        self.is_active = True
-
-                template_data = RESPONSE_TEMPLATES[scenario]
-                return TempTemplate(
-                    template_data["text"], template_data.get("requires_params", {})
-                )
+            if scenario in _FALLBACK_TEMPLATES:
+                return _FALLBACK_TEMPLATES[scenario]
 
             logger.error(f"Error fetching template for {scenario}: {str(e)}")
             return None
@@ -224,6 +244,63 @@ class ResponseManager:
             logger.error(error_msg)
             return None, error_msg
 
+    async def create_bot_responses(
+        self,
+        scenario: str,
+        client_ids: List[str],
+        params: Dict[str, str] = None,
+        message_type: MessageType = MessageType.BOT_AUTO,
+    ) -> Tuple[List[Message], Optional[str]]:
+        """
+        Create the same bot response for many clients at once
+
+        The template is fetched and personalized once and all messages are
+        written in a single flush (one batched INSERT).
+
+        Args:
+            scenario: Scenario name
+            client_ids: Clients to create the response for
+            params: Parameters for personalization
+            message_type: Type of message (auto, escalated, etc)
+
+        Returns:
+            (Message objects in client_ids order, response_text) or ([], error_message)
+        """
+        try:
+            template = await self.get_response_template(scenario)
+            if not template:
+                error_msg = f"No template found for scenario {scenario}"
+                logger.warning(error_msg)
+                return [], error_msg
+
+            response_text = await self.personalize_response(
+                template.template_text, params
+            )
+
+            messages = [
+                Message(
+                    id=uuid.uuid4(),
+                    client_id=client_id,
+                    content=response_text,
+                    message_type=message_type,
+                    is_processed=True,
+                )
+                for client_id in client_ids
+            ]
+            self.session.add_all(messages)
+            await self.session.flush()
+
+            logger.info(
+                f"Created {len(messages)} bot responses: scenario={scenario}"
+            )
+
+            return messages, response_text
+
+        except Exception as e:
+            error_msg = f"Error creating bot responses: {str(e)}"
+            logger.error(error_msg)
+            return [], error_msg
+
     async def create_fallback_response(
         self, client_id: str, reason: str = "unknown"
     ) -> Tuple[Optional[Message], str]:
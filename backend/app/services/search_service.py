@@ -154,33 +154,31 @@ class SearchService:
         if not client_ids:
             return dialogs
 
-        # Batch load all classifications for all clients (prevent N+1)
-        # Use JOIN to get client_id directly without separate queries
+        # Batch load the classification fields used below for all clients
+        # (prevent N+1); plain columns, no ORM objects
         class_result = await self.session.execute(
-            select(Classification, Message.client_id)
+            select(
+                Message.client_id,
+                Classification.confidence,
+                Classification.detected_scenario,
+            )
             .join(Message, Classification.message_id == Message.id)
             .where(Message.client_id.in_(client_ids))
         )
-        all_classifications_data = class_result.all()
         classifications_by_client = {}
-        for c, client_id in all_classifications_data:
+        for client_id, confidence, detected_scenario in class_result.all():
             if client_id not in classifications_by_client:
                 classifications_by_client[client_id] = []
-            classifications_by_client[client_id].append(c)
+            classifications_by_client[client_id].append((confidence, detected_scenario))
 
-        # Batch load all feedbacks for all clients (prevent N+1)
-        # Use JOIN to get client_id directly without separate queries
+        # Only the number of feedbacks per client is needed
         feedback_result = await self.session.execute(
-            select(OperatorFeedback, Message.client_id)
+            select(Message.client_id, func.count(OperatorFeedback.id))
             .join(Message, OperatorFeedback.message_id == Message.id)
             .where(Message.client_id.in_(client_ids))
+            .group_by(Message.client_id)
         )
-        all_feedbacks_data = feedback_result.all()
-        feedbacks_by_client = {}
-        for f, client_id in all_feedbacks_data:
-            if client_id not in feedbacks_by_client:
-                feedbacks_by_client[client_id] = []
-            feedbacks_by_client[client_id].append(f)
+        feedback_counts = dict(feedback_result.tuples().all())
 
         for row in rows:
             client_id = row.client_id
@@ -188,20 +186,21 @@ class SearchService:
             first_msg = row.first_message
             last_msg = row.last_message
 
-            # Get pre-loaded classifications and feedbacks
+            # Get pre-loaded classifications and feedback counts
             classifications = classifications_by_client.get(client_id, [])
-            feedbacks = feedbacks_by_client.get(client_id, [])
+            feedback_count = feedback_counts.get(client_id, 0)
 
             # Filter by feedback if requested
             if has_feedback is not None:
-                if has_feedback and len(feedbacks) == 0:
+                if has_feedback and feedback_count == 0:
                     continue
-                if not has_feedback and len(feedbacks) > 0:
+                if not has_feedback and feedback_count > 0:
                     continue
 
             # Calculate stats
             avg_confidence = (
-                sum(c.confidence for c in classifications) / len(classifications)
+                sum(confidence for confidence, _ in classifications)
+                / len(classifications)
                 if classifications
                 else 0
             )
@@ -213,9 +212,9 @@ class SearchService:
                     "first_message_at": first_msg.isoformat(),
                     "last_message_at": last_msg.isoformat(),
                     "avg_confidence": avg_confidence,
-                    "feedback_count": len(feedbacks),
+                    "feedback_count": feedback_count,
                     "scenarios": list(
-                        set(str(c.detected_scenario.value) for c in classifications)
+                        set(str(scenario.value) for _, scenario in classifications)
                     ),
                 }
             )
@@ -25,6 +25,13 @@ class TextProcessor:
         r"^[a-z]{20,}$",  # Many random Latin chars
     ]
 
+    # One alternation per table so each message is scanned once, not per entry
+    _TYPO_RE = re.compile("|".join(map(re.escape, TYPO_MAP)))
+    _NOISE_RE = re.compile(
+        "|".join(f"(?:{p})" for p in KEYBOARD_NOISE_PATTERNS), re.IGNORECASE
+    )
+    _CORRECTIONS = frozenset(TYPO_MAP.values())
+
     def __init__(self, typo_threshold: float = 0.8):
         """
         Initialize TextProcessor
@@ -75,13 +82,14 @@ class TextProcessor:
         1. First try direct replacements from TYPO_MAP
         2. Then use fuzzy matching for longer words
         """
-        text_lower = text.lower()
-
         # Direct replacements
-        for typo, correction in self.TYPO_MAP.items():
-            if typo in text_lower:
-                text = text.replace(typo, correction)
-                logger.debug(f"Fixed typo: {typo} -> {correction}")
+        def _replace(match: re.Match) -> str:
+            typo = match.group(0)
+            correction = self.TYPO_MAP[typo]
+            logger.debug(f"Fixed typo: {typo} -> {correction}")
+            return correction
+
+        text = self._TYPO_RE.sub(_replace, text)
 
         # Fuzzy matching for words
         words = text.split()
@@ -97,10 +105,9 @@ class TextProcessor:
             best_match = None
             best_ratio = 0
 
-            for correct_word in set(self.TYPO_MAP.values()):
-                ratio = SequenceMatcher(
-                    None, word.lower(), correct_word.lower()
-                ).ratio()
+            word_lower = word.lower()
+            for correct_word in self._CORRECTIONS:
+                ratio = SequenceMatcher(None, word_lower, correct_word).ratio()
                 if ratio > best_ratio and ratio >= self.typo_threshold:
                     best_ratio = ratio
                     best_match = correct_word
@@ -120,10 +127,9 @@ class TextProcessor:
         Detect and remove noise/random input
         Returns None if text is identified as noise
         """
-        for pattern in self.KEYBOARD_NOISE_PATTERNS:
-            if re.match(pattern, text.lower()):
-                logger.warning(f"Detected keyboard noise: {text[:50]}")
-                return None
+        if self._NOISE_RE.match(text):
+            logger.warning(f"Detected keyboard noise: {text[:50]}")
+            return None
 
         return text
 
@@ -133,9 +139,12 @@ class TextProcessor:
 
         Pipeline:
         1. Clean
-        2. Detect noise
-        3. Correct typos
-        4. Normalize
+        2. Normalize
+        3. Detect noise
+        4. Correct typos
+
+        Text is lowercased once, right after cleaning, so the later steps
+        work on the normalized string instead of lowercasing it again
         """
         if not text:
             return ""
@@ -143,17 +152,29 @@ class TextProcessor:
         # Step 1: Clean
         text = self.clean_text(text)
 
-        # Step 2: Remove noise
+        # Step 2: Normalize
+        text = self.normalize_text(text)
+
+        # Step 3: Remove noise
         text = self.remove_noise(text)
         if text is None:
             return ""
 
-        # Step 3: Correct typos
+        # Step 4: Correct typos
         text = self.correct_typos(text)
 
-        # Step 4: Normalize
-        text = self.normalize_text(text)
-
         logger.debug(f"Processed text: {text}")
 
         return text
+
+
+# Global processor instance (holds no per-request state)
+_processor: Optional[TextProcessor] = None
+
+
+def get_text_processor() -> TextProcessor:
+    """Get global text processor instance"""
+    global _processor
+    if _processor is None:
+        _processor = TextProcessor()
+    return _processor
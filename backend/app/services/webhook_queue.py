@@ -0,0 +1,209 @@
+"""
+Webhook delivery queue
+Background workers that send webhooks off the caller's path, so a slow or
+failing platform endpoint does not hold up the code that produced the message.
+Delayed deliveries wait in a heap drained by a single timer task instead of
+each pinning a sleeping coroutine.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.services.webhook_sender import WebhookSender
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookQueue:
+    """asyncio.Queue consumed by a fixed pool of webhook workers"""
+
+    def __init__(
+        self,
+        workers: int = 4,
+        failure_threshold: int = 5,
+        cooldown_seconds: float = 30.0,
+        max_size: int = 10000,
+    ):
+        """
+        Initialize WebhookQueue
+
+        Args:
+            workers: Number of concurrent delivery workers
+            failure_threshold: Consecutive failures that open the circuit breaker
+            cooldown_seconds: How long workers pause while the breaker is open
+            max_size: Queued plus delayed items accepted before enqueue refuses
+        """
+        self.workers = workers
+        self.max_size = max_size
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._consecutive_failures = 0
+        self._open_until = 0.0
+        # (deadline, seq, item) entries for delayed deliveries
+        self._timers: List[Tuple[float, int, tuple]] = []
+        self._timer_seq = itertools.count()
+        self._timer_task: Optional[asyncio.Task] = None
+        self._timer_wakeup: Optional[asyncio.Event] = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self) -> None:
+        """Spawn the worker tasks (must be called from the running loop)"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._timer_wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._worker()) for _ in range(self.workers)
+        ]
+        self._timer_task = asyncio.create_task(self._run_timers())
+        logger.info(f"Webhook queue started with {self.workers} workers")
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Let queued webhooks drain (up to timeout), then stop the workers"""
+        if not self.running:
+            return
+        # Deliver delayed items now rather than dropping them
+        self._timer_task.cancel()
+        await asyncio.gather(self._timer_task, return_exceptions=True)
+        while self._timers:
+            _, _, item = heapq.heappop(self._timers)
+            self._queue.put_nowait(item)
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"⚠️ Webhook queue stopped with {self._queue.qsize()} undelivered items"
+            )
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._timer_task = None
+
+    def enqueue(
+        self,
+        sender: WebhookSender,
+        client_id: str,
+        response_text: str,
+        message_id: str,
+        classification: Optional[Dict] = None,
+        delay: float = 0,
+    ) -> bool:
+        """
+        Queue a webhook for background delivery
+
+        Args:
+            delay: Seconds to wait before the webhook is sent
+
+        Returns:
+            False if the queue is not running or is full (caller should send
+            inline)
+        """
+        if not self.running:
+            return False
+        if self._queue.qsize() + len(self._timers) >= self.max_size:
+            logger.warning(
+                f"⚠️ Webhook queue full ({self.max_size} items), sending inline"
+            )
+            return False
+        item = (sender, client_id, response_text, message_id, classification)
+        if delay > 0:
+            heapq.heappush(
+                self._timers, (time.monotonic() + delay, next(self._timer_seq), item)
+            )
+            self._timer_wakeup.set()
+        else:
+            self._queue.put_nowait(item)
+        return True
+
+    async def _run_timers(self) -> None:
+        """Move delayed items onto the queue as their deadlines pass"""
+        while True:
+            if not self._timers:
+                await self._timer_wakeup.wait()
+                self._timer_wakeup.clear()
+                continue
+
+            remaining = self._timers[0][0] - time.monotonic()
+            if remaining > 0:
+                # Sleep until the earliest deadline or until an item is added
+                try:
+                    await asyncio.wait_for(self._timer_wakeup.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+                self._timer_wakeup.clear()
+                continue
+
+            _, _, item = heapq.heappop(self._timers)
+            self._queue.put_nowait(item)
+
+    async def _worker(self) -> None:
+        while True:
+            item = await self._queue.get()
+            try:
+                # Circuit breaker: back off while the endpoint keeps failing
+                pause = self._open_until - time.monotonic()
+                if pause > 0:
+                    await asyncio.sleep(pause)
+                await self._deliver(*item)
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(
+        self,
+        sender: WebhookSender,
+        client_id: str,
+        response_text: str,
+        message_id: str,
+        classification: Optional[Dict],
+    ) -> None:
+        try:
+            # send_response retries transient errors itself
+            result = await sender.send_response(
+                client_id=client_id,
+                response_text=response_text,
+                message_id=message_id,
+                classification=classification,
+            )
+            success = result.get("success", False)
+            if not success:
+                logger.error(
+                    f"❌ Queued webhook failed for client {client_id}: {result.get('error')}"
+                )
+        except Exception as e:
+            success = False
+            logger.error(f"❌ Queued webhook failed for client {client_id}: {e}")
+
+        if success:
+            self._consecutive_failures = 0
+            return
+
+        self._consecutive_failures += 1
+        if self._consecutive_failures >= self.failure_threshold:
+            self._open_until = time.monotonic() + self.cooldown_seconds
+            logger.warning(
+                f"⚠️ Webhook circuit open after {self._consecutive_failures} "
+                f"consecutive failures, pausing {self.cooldown_seconds:.0f}s"
+            )
+            self._consecutive_failures = 0
+
+
+# Global queue instance (workers are started on application startup)
+_queue: Optional[WebhookQueue] = None
+
+
+def get_webhook_queue() -> WebhookQueue:
+    """Get global webhook queue instance"""
+    global _queue
+    if _queue is None:
+        _queue = WebhookQueue()
+    return _queue
@@ -1,7 +1,10 @@
 import logging
-from typing import Dict, Optional
+from functools import lru_cache
+from typing import Dict, Optional, Union
+from uuid import UUID
 
 import httpx
+import orjson
 from httpx import HTTPStatusError, NetworkError
 from tenacity import retry, stop_after_attempt, wait_exponential
 
@@ -9,6 +12,45 @@ from app.config import get_settings
 
 logger = logging.getLogger(__name__)
 
+# HTTP/2 lets concurrent sends to one endpoint share a connection; it needs
+# the optional h2 package (httpx[http2])
+try:
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Shared HTTP client so connections to webhook endpoints are kept alive
+# between sends (created lazily on first use)
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_webhook_client() -> httpx.AsyncClient:
+    """Get the pooled HTTP client used for all webhook sends"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        # HTTP/1.1 connections are kept alive by default; no Connection
+        # header is set since HTTP/2 forbids it
+        _http_client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            # Keep enough idle connections for a full mass-notification fan-out
+            limits=httpx.Limits(
+                max_connections=100,
+                max_keepalive_connections=50,
+                keepalive_expiry=60,
+            ),
+        )
+    return _http_client
+
+
+async def close_webhook_client():
+    """Close the pooled webhook HTTP client"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
 
 class WebhookSender:
     """Send responses back to the chat platform via webhook"""
@@ -47,7 +89,7 @@ class WebhookSender:
         self,
         client_id: str,
         response_text: str,
-        message_id: str,
+        message_id: Union[str, UUID],
         classification: Dict = None,
     ) -> Dict[str, any]:
         """
@@ -56,7 +98,7 @@ class WebhookSender:
         Args:
             client_id: Client identifier
             response_text: Response text to send
-            message_id: ID of the bot response message
+            message_id: ID of the bot response message (UUIDs are encoded as strings)
             classification: Classification info for tracking
 
         Returns:
@@ -76,19 +118,20 @@ class WebhookSender:
             }
 
             # Prepare headers (include platform-specific headers)
-            headers = {}
+            headers = {"Content-Type": "application/json"}
             if self.chat_id:
                 headers["X-Chat-ID"] = self.chat_id
             if self.platform:
                 headers["X-Platform"] = self.platform
 
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    self.platform_webhook_url,
-                    json=payload,
-                    headers=headers,
-                    timeout=self.timeout,
-                )
+            client = get_webhook_client()
+            response = await client.post(
+                self.platform_webhook_url,
+                # orjson writes UUID values as strings itself
+                content=orjson.dumps(payload),
+                headers=headers,
+                timeout=self.timeout,
+            )
 
             # Handle different status codes
             if response.status_code in [200, 201]:
@@ -170,3 +213,9 @@ class WebhookSender:
                 "error": f"Unexpected error: {str(e)}",
                 "retryable": False,
             }
+
+
+@lru_cache()
+def get_webhook_sender() -> WebhookSender:
+    """Shared sender for the default platform webhook URL"""
+    return WebhookSender()
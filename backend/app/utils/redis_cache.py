@@ -2,11 +2,11 @@
 Redis Cache Implementation
 Distributed cache using Redis for multi-instance deployments
 """
-import json
 import logging
 from datetime import datetime, timedelta
-from typing import Any, Optional
+from typing import Any, List, Optional
 
+import orjson
 import redis.asyncio as aioredis
 from redis.asyncio import Redis
 
@@ -79,22 +79,41 @@ class RedisCache:
                 # Use fallback cache
                 return self._get_fallback_cache().get(key)
                 
-            value = await client.get(key)
-            if value is None:
-                return None
-
-            # Deserialize JSON
-            try:
-                return json.loads(value)
-            except (json.JSONDecodeError, TypeError):
-                # If not JSON, return as string
-                return value
+            return self._deserialize(await client.get(key))
 
         except Exception as e:
             logger.warning(f"Redis get error for key {key}: {e}, using fallback")
             # Fallback to in-memory cache on error
             return self._get_fallback_cache().get(key)
 
+    async def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        """Get several values in one round trip (Redis or fallback)"""
+        try:
+            client = await self._get_client()
+            if client is None:
+                # Use fallback cache
+                fallback = self._get_fallback_cache()
+                return [fallback.get(key) for key in keys]
+
+            return [self._deserialize(value) for value in await client.mget(keys)]
+
+        except Exception as e:
+            logger.warning(f"Redis mget error for keys {keys}: {e}, using fallback")
+            # Fallback to in-memory cache on error
+            fallback = self._get_fallback_cache()
+            return [fallback.get(key) for key in keys]
+
+    @staticmethod
+    def _deserialize(value: Any) -> Optional[Any]:
+        """Decode a stored value: JSON if possible, else the raw string"""
+        if value is None:
+            return None
+        try:
+            return orjson.loads(value)
+        except (orjson.JSONDecodeError, TypeError):
+            # If not JSON, return as string
+            return value
+
     async def set(
         self, key: str, value: Any, ttl_seconds: int = 3600
     ) -> bool:
@@ -108,7 +127,9 @@ class RedisCache:
 
             # Serialize to JSON
             try:
-                serialized = json.dumps(value, default=str)
+                serialized = orjson.dumps(
+                    value, default=str, option=orjson.OPT_NON_STR_KEYS
+                )
             except (TypeError, ValueError):
                 # If can't serialize, convert to string
                 serialized = str(value)
@@ -122,6 +143,47 @@ class RedisCache:
             self._get_fallback_cache().set(key, value, ttl_seconds)
             return True
 
+    async def add(
+        self, key: str, value: Any, ttl_seconds: int = 3600
+    ) -> bool:
+        """Set value with TTL only if key is not set yet; True if it was written"""
+        try:
+            client = await self._get_client()
+            if client is None:
+                # Use fallback cache
+                return self._add_fallback(key, value, ttl_seconds)
+
+            # Serialize to JSON
+            try:
+                serialized = orjson.dumps(
+                    value, default=str, option=orjson.OPT_NON_STR_KEYS
+                )
+            except (TypeError, ValueError):
+                # If can't serialize, convert to string
+                serialized = str(value)
+
+            return bool(await client.set(key, serialized, ex=ttl_seconds, nx=True))
+
+        except Exception as e:
+            logger.warning(f"Redis add error for key {key}: {e}, using fallback")
+            # Fallback to in-memory cache on error
+            return self._add_fallback(key, value, ttl_seconds)
+
+    def _add_fallback(self, key: str, value: Any, ttl_seconds: int) -> bool:
+        """Set a value in the in-memory fallback cache unless already present"""
+        fallback = self._get_fallback_cache()
+        if fallback.get(key) is not None:
+            return False
+        fallback.set(key, value, ttl_seconds)
+        return True
+
+    def _incr_fallback(self, key: str, ttl_seconds: int) -> int:
+        """Increment a counter stored in the in-memory fallback cache"""
+        fallback = self._get_fallback_cache()
+        value = (fallback.get(key) or 0) + 1
+        fallback.set(key, value, ttl_seconds)
+        return value
+
     async def delete(self, key: str) -> bool:
         """Delete key from cache (Redis or fallback)"""
         try:
@@ -65,5 +65,13 @@ if __name__ == "__main__":
     # You can run migrations before starting:
     # asyncio.run(run_migrations())
     
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # uvloop ships with uvicorn[standard]; fall back to asyncio where it is unavailable
+    try:
+        import uvloop  # noqa: F401
+
+        loop = "uvloop"
+    except ImportError:
+        loop = "asyncio"
+
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop=loop)
 
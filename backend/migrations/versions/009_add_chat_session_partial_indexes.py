@@ -0,0 +1,43 @@
+"""Add partial indexes for inactive session scans
+
+Revision ID: 009_add_chat_session_partial_indexes
+Revises: 008_add_failed_attempts_to_reminders
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '009_add_chat_session_partial_indexes'
+down_revision = '008_add_failed_attempts_to_reminders'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Only OPEN sessions are scanned by the auto-close job, so partial indexes
+    # keep the scan proportional to open dialogs instead of total history
+
+    # Auto-close sweep: status = open AND last_activity_at <= cutoff
+    op.create_index(
+        'ix_chat_sessions_open_activity',
+        'chat_sessions',
+        ['last_activity_at'],
+        unique=False,
+        postgresql_where=sa.text("status = 'open'")
+    )
+
+    # Farewell page scan: ... AND farewell_sent_at IS NULL
+    op.create_index(
+        'ix_chat_sessions_farewell_pending',
+        'chat_sessions',
+        ['last_activity_at'],
+        unique=False,
+        postgresql_where=sa.text("status = 'open' AND farewell_sent_at IS NULL")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_chat_sessions_farewell_pending', table_name='chat_sessions')
+    op.drop_index('ix_chat_sessions_open_activity', table_name='chat_sessions')
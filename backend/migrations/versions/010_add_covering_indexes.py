@@ -0,0 +1,77 @@
+"""Replace hot composite indexes with covering (INCLUDE) versions
+
+Revision ID: 010_add_covering_indexes
+Revises: 009_add_chat_session_partial_indexes
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '010_add_covering_indexes'
+down_revision = '009_add_chat_session_partial_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The INCLUDE columns are the ones the hot queries project, so Postgres
+    # can answer them with index-only scans instead of a heap fetch per row.
+    # Each covering index supersedes the plain composite index from 006.
+
+    # Escalation history and farewell context: per-client messages by time
+    op.create_index(
+        'ix_messages_client_created_covering',
+        'messages',
+        ['client_id', 'created_at'],
+        unique=False,
+        postgresql_include=['id', 'message_type'],
+    )
+    op.drop_index('ix_messages_client_created', table_name='messages')
+
+    # Escalation history: failure counts joined through message_id
+    op.create_index(
+        'ix_classifications_message_created_covering',
+        'classifications',
+        ['message_id', 'created_at'],
+        unique=False,
+        postgresql_include=['confidence', 'detected_scenario'],
+    )
+    op.drop_index('ix_classifications_message_created', table_name='classifications')
+
+    # Auto-close scans by status and activity
+    op.create_index(
+        'ix_chat_sessions_status_activity_covering',
+        'chat_sessions',
+        ['status', 'last_activity_at'],
+        unique=False,
+        postgresql_include=['farewell_sent_at', 'client_id'],
+    )
+    op.drop_index('ix_chat_sessions_status_activity', table_name='chat_sessions')
+
+
+def downgrade() -> None:
+    op.create_index(
+        'ix_chat_sessions_status_activity',
+        'chat_sessions',
+        ['status', 'last_activity_at'],
+        unique=False
+    )
+    op.drop_index('ix_chat_sessions_status_activity_covering', table_name='chat_sessions')
+
+    op.create_index(
+        'ix_classifications_message_created',
+        'classifications',
+        ['message_id', 'created_at'],
+        unique=False
+    )
+    op.drop_index('ix_classifications_message_created_covering', table_name='classifications')
+
+    op.create_index(
+        'ix_messages_client_created',
+        'messages',
+        ['client_id', 'created_at'],
+        unique=False
+    )
+    op.drop_index('ix_messages_client_created_covering', table_name='messages')
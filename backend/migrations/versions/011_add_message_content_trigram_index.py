@@ -0,0 +1,35 @@
+"""Add pg_trgm trigram index on message content
+
+Revision ID: 011_add_message_content_trigram_index
+Revises: 010_add_covering_indexes
+Create Date: 2026-10-16 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '011_add_message_content_trigram_index'
+down_revision = '010_add_covering_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Mass outage detection matches recent messages with the pg_trgm %
+    # operator; the GIN index lets Postgres answer it without comparing
+    # every row in the window
+    op.execute(sa.text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    op.create_index(
+        'ix_messages_content_trgm',
+        'messages',
+        ['content'],
+        unique=False,
+        postgresql_using='gin',
+        postgresql_ops={'content': 'gin_trgm_ops'},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_messages_content_trgm', table_name='messages')
+    # The extension is left installed; other objects may depend on it
@@ -0,0 +1,32 @@
+"""Add partial index on recent user messages
+
+Revision ID: 012_add_user_message_time_index
+Revises: 011_add_message_content_trigram_index
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '012_add_user_message_time_index'
+down_revision = '011_add_message_content_trigram_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Mass outage detection scans user messages of the last few minutes:
+    # message_type = 'user' AND created_at >= cutoff. Bot replies make up
+    # about half of the table, so the partial index skips them entirely
+    op.create_index(
+        'ix_messages_user_created',
+        'messages',
+        ['created_at'],
+        unique=False,
+        postgresql_where=sa.text("message_type = 'user'")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_messages_user_created', table_name='messages')
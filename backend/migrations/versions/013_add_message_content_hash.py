@@ -0,0 +1,31 @@
+"""Add content_hash fingerprint column to messages
+
+Revision ID: 013_add_message_content_hash
+Revises: 012_add_user_message_time_index
+Create Date: 2026-10-16 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '013_add_message_content_hash'
+down_revision = '012_add_user_message_time_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Duplicate detection compares this 16-byte blake2b digest instead of the
+    # full text. The application fills it on insert; older rows stay NULL,
+    # which is harmless since the duplicate window is only a few seconds.
+    # Lookups narrow by client and time through the existing
+    # (client_id, created_at) index, so the column needs no index of its own
+    op.add_column(
+        'messages',
+        sa.Column('content_hash', sa.LargeBinary(length=16), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('messages', 'content_hash')
@@ -8,5 +8,5 @@ alembic upgrade head
 
 echo "Starting FastAPI server..."
 
-exec uvicorn main:app --host 0.0.0.0 --port 8000 --workers 4
+exec uvicorn main:app --host 0.0.0.0 --port 8000 --workers 4 --loop uvloop
 
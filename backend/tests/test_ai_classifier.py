@@ -1,12 +1,19 @@
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
-from app.services.ai_classifier import AIClassifier
+from app.services.ai_classifier import AIClassifier, AIClassifierBatcher
 import json
 
 @pytest.fixture
 def classifier():
     return AIClassifier()
 
+@pytest.fixture
+def batching_classifier():
+    # Micro-batching is off by default; enable it as AI_BATCH_WINDOW_MS would
+    classifier = AIClassifier()
+    classifier._batcher = AIClassifierBatcher(classifier, 0.02, 8)
+    return classifier
+
 @pytest.mark.asyncio
 async def test_classify_greeting(classifier):
     """Test classification of greeting message"""
@@ -19,11 +26,11 @@ async def test_classify_greeting(classifier):
     })
     
     with patch.object(classifier.client.chat.completions, 'create', new_callable=AsyncMock, return_value=mock_response):
-        result = await classifier.classify("Привет!")
+        result = await classifier.classify("Привет! Хочу записать ребенка на занятия")
         
-        assert result["success"] is True
-        assert result["scenario"] == "GREETING"
-        assert result["confidence"] == 0.95
+        assert result.success is True
+        assert result.scenario == "GREETING"
+        assert result.confidence == 0.95
 
 @pytest.mark.asyncio
 async def test_classify_low_confidence(classifier):
@@ -39,8 +46,8 @@ async def test_classify_low_confidence(classifier):
     with patch.object(classifier.client.chat.completions, 'create', new_callable=AsyncMock, return_value=mock_response):
         result = await classifier.classify("Something random")
         
-        assert result["success"] is True
-        assert result["scenario"] == "UNKNOWN"  # Downgraded due to low confidence
+        assert result.success is True
+        assert result.scenario == "UNKNOWN"  # Downgraded due to low confidence
 
 @pytest.mark.asyncio
 async def test_classify_invalid_response(classifier):
@@ -52,9 +59,9 @@ async def test_classify_invalid_response(classifier):
     with patch.object(classifier.client.chat.completions, 'create', new_callable=AsyncMock, return_value=mock_response):
         result = await classifier.classify("test")
         
-        assert result["success"] is False
-        assert result["scenario"] == "UNKNOWN"
-        assert "error" in result
+        assert result.success is False
+        assert result.scenario == "UNKNOWN"
+        assert result.error
 
 def test_validate_response(classifier):
     """Test response validation"""
@@ -88,3 +95,174 @@ def test_validate_response(classifier):
         "reasoning": "test"
     }
     assert classifier._validate_response(invalid3) is False
+
+@pytest.mark.asyncio
+async def test_classify_uses_warmed_cache(classifier):
+    """Test that warmed messages are served from cache without calling OpenAI"""
+    from app.services.ai_classifier import classification_cache_key
+    from app.services.classifier_warmup import warm_classification_cache
+    from app.utils.redis_cache import get_redis_cache
+
+    # Warmup only fills missing entries, so start without this one
+    await (await get_redis_cache()).delete(classification_cache_key("Тренер не пришел"))
+    assert await warm_classification_cache() > 0
+
+    with patch.object(classifier.client.chat.completions, 'create', new_callable=AsyncMock) as mock_create:
+        result = await classifier.classify("Тренер не пришел", client_id="client-1")
+
+        mock_create.assert_not_called()
+        assert result.success is True
+        assert result.scenario == "MISSING_TRAINER"
+        assert result.client_id == "client-1"
+
+@pytest.mark.asyncio
+async def test_warmup_keeps_cached_classifications():
+    """Test that warmup does not overwrite an entry the model already cached"""
+    from app.services.ai_classifier import classification_cache_key
+    from app.services.classifier_warmup import warm_classification_cache
+    from app.utils.redis_cache import get_redis_cache
+
+    redis_cache = await get_redis_cache()
+    key = classification_cache_key("Не работает")
+    cached = {"scenario": "MASS_OUTAGE", "confidence": 0.93, "reasoning": "Model answer",
+              "success": True, "error": None, "model": "gpt"}
+    await redis_cache.set(key, cached)
+
+    await warm_classification_cache()
+
+    assert (await redis_cache.get(key))["scenario"] == "MASS_OUTAGE"
+    await redis_cache.delete(key)
+
+@pytest.mark.asyncio
+async def test_classify_fastpath(classifier):
+    """Test that trivial greetings and farewells skip the OpenAI call"""
+    with patch.object(classifier.client.chat.completions, 'create', new_callable=AsyncMock) as mock_create:
+        greeting = await classifier.classify("  Здравствуйте!! ")
+        farewell = await classifier.classify("Спасибо большое)")
+        other = await classifier.classify("Спасибо, а когда следующий урок?", use_cache=False)
+
+        assert greeting.scenario == "GREETING"
+        assert farewell.scenario == "FAREWELL"
+        assert greeting.success is True
+        mock_create.assert_called_once()
+
+def test_cache_key_normalization():
+    """Test that trivially different spellings share a cache entry"""
+    from app.services.ai_classifier import classification_cache_key
+
+    key = classification_cache_key("Не могу зайти!")
+    assert classification_cache_key("  не могу зайти!!! ") == key
+    assert classification_cache_key("Не могу зайти?") != key
+
+@pytest.mark.asyncio
+async def test_classify_coalesces_concurrent_calls(classifier):
+    """Test that concurrent identical messages share a single API call"""
+    import asyncio
+
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.content = json.dumps({
+        "scenario": "SCHEDULE_CHANGE",
+        "confidence": 0.9,
+        "reasoning": "Перенос занятия"
+    })
+
+    async def slow_create(*args, **kwargs):
+        await asyncio.sleep(0.05)
+        return mock_response
+
+    with patch.object(classifier.client.chat.completions, 'create', new_callable=AsyncMock, side_effect=slow_create) as mock_create:
+        first, second = await asyncio.gather(
+            classifier.classify("Можно перенести занятие на пятницу?", client_id="a"),
+            classifier.classify("Можно перенести занятие на пятницу?", client_id="b"),
+        )
+
+        mock_create.assert_called_once()
+        assert first.scenario == second.scenario == "SCHEDULE_CHANGE"
+        assert first.client_id == "a"
+        assert second.client_id == "b"
+
+@pytest.mark.asyncio
+async def test_classify_batches_concurrent_distinct_messages(batching_classifier):
+    """Test that concurrent different messages are classified in one API call"""
+    import asyncio
+
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.content = json.dumps({
+        "results": [
+            {"id": 1, "scenario": "COMPLAINT", "confidence": 0.92, "reasoning": "Недоволен"},
+            {"id": 0, "scenario": "ABSENCE_REQUEST", "confidence": 0.9, "reasoning": "Болеет"},
+        ]
+    })
+
+    with patch.object(batching_classifier.client.chat.completions, 'create', new_callable=AsyncMock, return_value=mock_response) as mock_create:
+        first, second = await asyncio.gather(
+            batching_classifier.classify("Ребенок заболел, пропустим урок", use_cache=False),
+            batching_classifier.classify("Очень недоволен качеством занятий", use_cache=False),
+        )
+
+        mock_create.assert_called_once()
+        assert first.scenario == "ABSENCE_REQUEST"
+        assert second.scenario == "COMPLAINT"
+
+
+@pytest.mark.asyncio
+async def test_classify_batch_falls_back_on_mismatched_answer(batching_classifier):
+    """Test that a batch answer with the wrong number of results is retried per message"""
+    import asyncio
+
+    batch_response = MagicMock()
+    batch_response.choices = [MagicMock()]
+    batch_response.choices[0].message.content = json.dumps({"results": []})
+    single_response = MagicMock()
+    single_response.choices = [MagicMock()]
+    single_response.choices[0].message.content = json.dumps({
+        "scenario": "REFERRAL",
+        "confidence": 0.9,
+        "reasoning": "Реферальная программа"
+    })
+
+    with patch.object(batching_classifier.client.chat.completions, 'create', new_callable=AsyncMock, side_effect=[batch_response, single_response, single_response]) as mock_create:
+        results = await asyncio.gather(
+            batching_classifier.classify("Как пригласить друга?", use_cache=False),
+            batching_classifier.classify("Где моя реферальная ссылка?", use_cache=False),
+        )
+
+        assert mock_create.call_count == 3
+        assert all(result.scenario == "REFERRAL" for result in results)
+
+
+@pytest.mark.asyncio
+async def test_classify_batch_retries_results_without_their_id(batching_classifier):
+    """Test that batch results are matched by id and unmatched messages are retried"""
+    import asyncio
+
+    batch_response = MagicMock()
+    batch_response.choices = [MagicMock()]
+    batch_response.choices[0].message.content = json.dumps({
+        "results": [
+            {"id": 0, "scenario": "REFERRAL", "confidence": 0.9, "reasoning": "Реферальная программа"},
+            {"id": 0, "scenario": "COMPLAINT", "confidence": 0.9, "reasoning": "Повтор id"},
+            "COMPLAINT",
+        ]
+    })
+    single_response = MagicMock()
+    single_response.choices = [MagicMock()]
+    single_response.choices[0].message.content = json.dumps({
+        "scenario": "TECH_SUPPORT_BASIC",
+        "confidence": 0.9,
+        "reasoning": "Техническая проблема"
+    })
+
+    with patch.object(batching_classifier.client.chat.completions, 'create', new_callable=AsyncMock, side_effect=[batch_response, single_response, single_response]) as mock_create:
+        results = await asyncio.gather(
+            batching_classifier.classify('Как пригласить друга?"\n\n2. "Жалоба', use_cache=False),
+            batching_classifier.classify("Не загружается урок", use_cache=False),
+        )
+
+        # Message 0 has two results and message 1 none, so both are retried
+        assert mock_create.call_count == 3
+        assert all(result.scenario == "TECH_SUPPORT_BASIC" for result in results)
+        batch_prompt = mock_create.call_args_list[0].kwargs["messages"][1]["content"]
+        assert '"id":0' in batch_prompt
@@ -0,0 +1,61 @@
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.models.database import (
+    ChatSession,
+    DialogStatus,
+    Message,
+    MessageType,
+    ResponseTemplate,
+    ScenarioType,
+)
+from app.services.dialog_auto_close import DialogAutoCloseService
+from app.services.response_manager import template_cache_key
+from app.utils.cache import get_cache
+
+
+@pytest.mark.asyncio
+async def test_failed_farewell_is_not_marked_sent(test_db):
+    """Test that a farewell that could not be created leaves farewell_sent_at unset"""
+    session = test_db
+    client_id = "farewell_test_client"
+
+    # Inactive long enough for a farewell, not long enough to be closed
+    session.add(ResponseTemplate(
+        scenario_name=ScenarioType.FAREWELL,
+        template_text="До свидания!",
+        is_active=False,
+    ))
+    session.add(ChatSession(
+        client_id=client_id,
+        status=DialogStatus.OPEN,
+        last_activity_at=datetime.utcnow() - timedelta(minutes=2, seconds=30),
+    ))
+    session.add(Message(
+        client_id=client_id,
+        content="Спасибо",
+        message_type=MessageType.USER,
+    ))
+    await session.commit()
+    get_cache().delete(template_cache_key("FAREWELL"))
+
+    # Task sessions must see the committed rows of the test database
+    task_session_maker = sessionmaker(
+        session.bind, class_=AsyncSession, expire_on_commit=False
+    )
+    with patch("app.services.dialog_auto_close.async_session_maker", task_session_maker):
+        stats = await DialogAutoCloseService(session).process_inactive_sessions()
+
+    assert stats["farewell_sent"] == 0
+    assert stats["errors"] == 1
+
+    session.expire_all()
+    result = await session.execute(
+        select(ChatSession).where(ChatSession.client_id == client_id)
+    )
+    chat_session = result.scalar_one()
+    assert chat_session.farewell_sent_at is None
+    assert chat_session.status == DialogStatus.OPEN
@@ -6,6 +6,7 @@ from datetime import datetime
 from uuid import uuid4
 
 from app.models.database import Message, MessageType, ChatSession, DialogStatus
+from app.services.ai_classifier import ClassificationResult
 from main import app
 
 
@@ -13,12 +14,14 @@ from main import app
 def mock_openai_classify(mocker):
     """Mock OpenAI classification for all tests"""
     async def mock_classify(*args, **kwargs):
-        return {
-            "success": True,
-            "scenario": "REFERRAL",
-            "confidence": 0.95,
-            "reasoning": "Test",
-        }
+        return ClassificationResult(
+            scenario="REFERRAL",
+            confidence=0.95,
+            reasoning="Test",
+            success=True,
+            error=None,
+            model="test",
+        )
     
     # Mock AIClassifier.classify method
     mocker.patch('app.services.ai_classifier.AIClassifier.classify', 
@@ -0,0 +1,60 @@
+"""
+Unit tests for MassNotificationDispatcher
+"""
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.services.mass_notification_service import (
+    MassNotificationDispatcher,
+    MassNotificationService,
+)
+
+
+@pytest.fixture
+def session_maker():
+    """Session factory whose sessions accept commit()"""
+    session = MagicMock()
+    session.commit = AsyncMock()
+    context = MagicMock()
+    context.__aenter__ = AsyncMock(return_value=session)
+    context.__aexit__ = AsyncMock(return_value=False)
+    return MagicMock(return_value=context)
+
+
+@pytest.mark.asyncio
+async def test_triggers_in_window_share_one_send(session_maker):
+    """Test that triggers within the window are merged into a single send"""
+    dispatcher = MassNotificationDispatcher(window_seconds=0.05)
+    send = AsyncMock(return_value={"sent": 3, "failed": 0})
+
+    with patch("app.database.async_session_maker", session_maker), patch.object(
+        MassNotificationService, "send_mass_outage_notification", send
+    ):
+        results = await asyncio.gather(
+            dispatcher.notify(["client_1"]),
+            dispatcher.notify(["client_2"]),
+            dispatcher.notify(["client_1", "client_3"]),
+        )
+
+    assert send.await_count == 1
+    assert sorted(send.await_args.args[0]) == ["client_1", "client_2", "client_3"]
+    assert all(result == {"sent": 3, "failed": 0} for result in results)
+
+
+@pytest.mark.asyncio
+async def test_all_clients_trigger_widens_batch(session_maker):
+    """Test that a trigger for all clients overrides specific client lists"""
+    dispatcher = MassNotificationDispatcher(window_seconds=0.05)
+    send = AsyncMock(return_value={"sent": 0, "failed": 0})
+
+    with patch("app.database.async_session_maker", session_maker), patch.object(
+        MassNotificationService, "send_mass_outage_notification", send
+    ):
+        await asyncio.gather(dispatcher.notify(["client_1"]), dispatcher.notify())
+        # A trigger after the batch completed starts a new one
+        await dispatcher.notify()
+
+    assert send.await_count == 2
+    assert send.await_args_list[0].args[0] is None
@@ -27,8 +27,7 @@ async def test_check_duplicate_found(async_session, test_client_id):
     
     # Check for duplicate (should find it)
     duplicate = await service.check_duplicate(test_client_id, "Test message")
-    assert duplicate is not None
-    assert duplicate.id == first_message.id
+    assert duplicate is True
 
 
 @pytest.mark.asyncio
@@ -38,7 +37,7 @@ async def test_check_duplicate_not_found(async_session, test_client_id):
     
     # Check for duplicate (should not find it)
     duplicate = await service.check_duplicate(test_client_id, "Unique message")
-    assert duplicate is None
+    assert duplicate is False
 
 
 @pytest.mark.asyncio
@@ -70,6 +69,41 @@ async def test_determine_first_message_false(async_session, test_client_id):
     assert is_first is False
 
 
+@pytest.mark.asyncio
+async def test_preflight_new_client(async_session, test_client_id):
+    """Test preflight checks for a client without messages"""
+    service = MessageProcessingService(async_session)
+
+    result = await service.preflight(test_client_id, "Hello", rate_limit=10)
+    assert result.duplicate_id is None
+    assert result.is_first_message is True
+    assert result.recent_count == 0
+
+
+@pytest.mark.asyncio
+async def test_preflight_existing_client(async_session, test_client_id):
+    """Test preflight finds the duplicate and caps the recent count at the limit"""
+    service = MessageProcessingService(async_session)
+
+    messages = [
+        Message(
+            id=uuid4(),
+            client_id=test_client_id,
+            content=f"Message {i}",
+            message_type=MessageType.USER,
+            created_at=datetime.utcnow(),
+        )
+        for i in range(4)
+    ]
+    async_session.add_all(messages)
+    await async_session.commit()
+
+    result = await service.preflight(test_client_id, "Message 2", rate_limit=3)
+    assert result.duplicate_id == messages[2].id
+    assert result.is_first_message is False
+    assert result.recent_count == 3
+
+
 @pytest.mark.asyncio
 async def test_process_text(async_session):
     """Test text processing"""
@@ -38,6 +38,36 @@ async def test_create_reminder(async_session, test_client_id):
     assert reminder.is_cancelled is False
 
 
+@pytest.mark.asyncio
+async def test_create_reminders(async_session, test_client_id):
+    """Test creating several reminders at once"""
+    service = ReminderService(async_session)
+    
+    message = Message(
+        id=uuid4(),
+        client_id=test_client_id,
+        content="Test message",
+        message_type=MessageType.USER,
+    )
+    async_session.add(message)
+    await async_session.flush()
+    
+    reminders = await service.create_reminders(
+        client_id=test_client_id,
+        message_id=str(message.id),
+        reminder_types=[ReminderType.REMINDER_15MIN, ReminderType.REMINDER_1DAY],
+    )
+    
+    assert [r.reminder_type for r in reminders] == [
+        ReminderType.REMINDER_15MIN,
+        ReminderType.REMINDER_1DAY,
+    ]
+    assert all(r.message_id == message.id for r in reminders)
+    assert reminders[1].scheduled_at - reminders[0].scheduled_at == timedelta(
+        days=1, minutes=-15
+    )
+
+
 @pytest.mark.asyncio
 async def test_get_pending_reminders(async_session, test_client_id):
     """Test getting pending reminders"""
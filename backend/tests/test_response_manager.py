@@ -53,3 +53,27 @@ async def test_personalize_response(test_db):
     result = await manager.personalize_response(template, params)
     
     assert result == "Привет John! Ваша ссылка: https://example.com"
+
+@pytest.mark.asyncio
+async def test_get_response_template_cached(test_db):
+    """Test that active templates are served from the cache between lookups"""
+    from app.services.response_manager import template_cache_key
+    from app.utils.cache import get_cache
+
+    session = test_db
+    manager = ResponseManager(session)
+    await manager.initialize_default_templates()
+    get_cache().delete(template_cache_key("GREETING"))
+
+    template = await manager.get_response_template("GREETING")
+    template.template_text = "Изменено"
+    await session.flush()
+
+    cached = await manager.get_response_template("GREETING")
+    assert "Здравствуйте" in cached.template_text
+    assert cached.scenario_name == ScenarioType.GREETING
+
+    get_cache().delete(template_cache_key("GREETING"))
+    refreshed = await manager.get_response_template("GREETING")
+    assert refreshed.template_text == "Изменено"
+    get_cache().delete(template_cache_key("GREETING"))
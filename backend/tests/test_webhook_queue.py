@@ -0,0 +1,86 @@
+"""
+Unit tests for WebhookQueue
+"""
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.services.webhook_queue import WebhookQueue
+
+
+@pytest.mark.asyncio
+async def test_enqueue_requires_running_queue():
+    """Test that enqueue reports False before workers are started"""
+    queue = WebhookQueue(workers=1)
+    sender = MagicMock()
+
+    assert queue.enqueue(sender, "client", "text", "msg_1") is False
+
+
+@pytest.mark.asyncio
+async def test_queued_webhooks_are_delivered():
+    """Test that workers deliver queued webhooks and drain on stop"""
+    queue = WebhookQueue(workers=2)
+    sender = MagicMock()
+    sender.send_response = AsyncMock(return_value={"success": True})
+
+    queue.start()
+    for i in range(3):
+        assert queue.enqueue(sender, f"client_{i}", "text", f"msg_{i}") is True
+    await queue.stop()
+
+    assert sender.send_response.await_count == 3
+    assert queue.running is False
+
+
+@pytest.mark.asyncio
+async def test_enqueue_refuses_when_full():
+    """Test that enqueue reports False once max_size items are waiting"""
+    queue = WebhookQueue(workers=1, max_size=2)
+    sender = MagicMock()
+    sender.send_response = AsyncMock(return_value={"success": True})
+
+    queue.start()
+    assert queue.enqueue(sender, "client", "text", "msg_1", delay=60) is True
+    assert queue.enqueue(sender, "client", "text", "msg_2", delay=60) is True
+    assert queue.enqueue(sender, "client", "text", "msg_3") is False
+    await queue.stop()
+
+    assert sender.send_response.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_circuit_opens_after_consecutive_failures():
+    """Test that repeated failures pause the workers"""
+    queue = WebhookQueue(workers=1, failure_threshold=2, cooldown_seconds=60)
+    sender = MagicMock()
+    sender.send_response = AsyncMock(side_effect=Exception("endpoint down"))
+
+    await queue._deliver(sender, "client", "text", "msg_1", None)
+    assert queue._open_until == 0.0
+
+    await queue._deliver(sender, "client", "text", "msg_2", None)
+    assert queue._open_until > 0.0
+
+
+@pytest.mark.asyncio
+async def test_delayed_webhooks_are_sent_in_deadline_order():
+    """Test that delayed webhooks wait for their deadline without blocking others"""
+    queue = WebhookQueue(workers=1)
+    sent = []
+    sender = MagicMock()
+    sender.send_response = AsyncMock(
+        side_effect=lambda **kwargs: sent.append(kwargs["client_id"]) or {"success": True}
+    )
+
+    queue.start()
+    queue.enqueue(sender, "late", "text", "msg_1", delay=0.2)
+    queue.enqueue(sender, "early", "text", "msg_2", delay=0.05)
+    queue.enqueue(sender, "now", "text", "msg_3")
+    await asyncio.sleep(0.1)
+    assert sent == ["now", "early"]
+
+    await asyncio.sleep(0.2)
+    assert sent == ["now", "early", "late"]
+    await queue.stop()
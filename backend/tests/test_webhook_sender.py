@@ -1,8 +1,10 @@
 """
 Unit tests for WebhookSender
 """
+import json
 import pytest
 from unittest.mock import AsyncMock, patch
+from uuid import uuid4
 from httpx import Response
 
 from app.services.webhook_sender import WebhookSender
@@ -13,13 +15,13 @@ async def test_send_response_success():
     """Test successful webhook send"""
     sender = WebhookSender(platform_webhook_url="http://test-webhook.com/response")
     
-    with patch('httpx.AsyncClient') as mock_client:
+    with patch('app.services.webhook_sender.get_webhook_client') as mock_client:
         mock_response = Response(
             200,
             json={"message_id": "123"},
             headers={"content-type": "application/json"}
         )
-        mock_client.return_value.__aenter__.return_value.post = AsyncMock(
+        mock_client.return_value.post = AsyncMock(
             return_value=mock_response
         )
         
@@ -41,11 +43,11 @@ async def test_send_response_retryable_error():
     from httpx import Request
     from httpx._exceptions import HTTPStatusError
     
-    with patch('httpx.AsyncClient') as mock_client:
+    with patch('app.services.webhook_sender.get_webhook_client') as mock_client:
         # Simulate retryable error (503)
         mock_request = Request("POST", "http://test-webhook.com/response")
         mock_response = Response(503, text="Service Unavailable", request=mock_request)
-        mock_client.return_value.__aenter__.return_value.post = AsyncMock(
+        mock_client.return_value.post = AsyncMock(
             return_value=mock_response
         )
         
@@ -63,10 +65,10 @@ async def test_send_response_non_retryable_error():
     """Test non-retryable error handling"""
     sender = WebhookSender(platform_webhook_url="http://test-webhook.com/response")
     
-    with patch('httpx.AsyncClient') as mock_client:
+    with patch('app.services.webhook_sender.get_webhook_client') as mock_client:
         # Simulate non-retryable error (400)
         mock_response = Response(400, text="Bad Request")
-        mock_client.return_value.__aenter__.return_value.post = AsyncMock(
+        mock_client.return_value.post = AsyncMock(
             return_value=mock_response
         )
         
@@ -89,10 +91,10 @@ async def test_send_response_with_platform_headers():
         chat_id="12345",
     )
     
-    with patch('httpx.AsyncClient') as mock_client:
+    with patch('app.services.webhook_sender.get_webhook_client') as mock_client:
         mock_response = Response(200, json={})
         mock_post = AsyncMock(return_value=mock_response)
-        mock_client.return_value.__aenter__.return_value.post = mock_post
+        mock_client.return_value.post = mock_post
         
         await sender.send_response(
             client_id="test_client",
@@ -107,3 +109,23 @@ async def test_send_response_with_platform_headers():
         assert headers.get("X-Platform") == "telegram"
         assert headers.get("X-Chat-ID") == "12345"
 
+
+
+@pytest.mark.asyncio
+async def test_send_response_encodes_uuid_message_id():
+    """Test that a UUID message_id is sent as its string form"""
+    sender = WebhookSender(platform_webhook_url="http://test-webhook.com/response")
+    message_id = uuid4()
+
+    with patch('app.services.webhook_sender.get_webhook_client') as mock_client:
+        mock_post = AsyncMock(return_value=Response(200, json={}))
+        mock_client.return_value.post = mock_post
+
+        await sender.send_response(
+            client_id="test_client",
+            response_text="Test",
+            message_id=message_id,
+        )
+
+        body = json.loads(mock_post.call_args[1]["content"])
+        assert body["message_id"] == str(message_id)